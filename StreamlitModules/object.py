@@ -64,8 +64,16 @@ def filter_block(
     elif mode == 'test':
         col[1].selectbox(
             '조회 대상',
-            ('📑 전체', '📸 사진', '🎬 동영상', '😆 이모티콘'),
+            (
+                '📑 전체',
+                '💬 텍스트',
+                '📸 사진',
+                '🎬 동영상',
+                '😆 이모티콘',
+                '📁 파일',
+                '🔗 링크',
+                '🗑️ 삭제됨',
+            ),
             key=f'{key}_select',
             index=0,
-            disabled=True
         )
@@ -5,9 +5,32 @@ import streamlit as st
 from StreamlitModules import dod_metric
 
 title = ':house: HOME'
+date_format = 'YYYY-MM-DD'
+page_size = 100
+
+PERIODS = {
+    'day': '전일 대비',
+    'week': '전주 대비',
+    'month': '전월 대비',
+}
+METRICS = {
+    'chats': ('대화', '회'),
+    'speakers': ('참여자', '명'),
+    'joins': ('유입', '명'),
+    'leaves': ('이탈', '명'),
+}
+
+
+def reset_page():
+    st.session_state.pop('home_messages_page', None)
 
 
 def main():
+    # 파일을 올린 뒤에만 분석 모듈을 불러옴
+    import altair as alt
+    from Utils.DataControl import MESSAGE_KINDS, TYPE_FILTERS
+    from Utils.HourlyCube import WEEKDAYS
+
     data = st.session_state['df']
 
     # Title
@@ -32,62 +55,154 @@ def main():
         f'{data.save_point}',
     )
 
-    # DoD
+    # Period over period
     st.write('---')
-    st.subheader('전일 대비')
+    period = st.radio(
+        '비교 기준',
+        list(PERIODS),
+        format_func=PERIODS.get,
+        horizontal=True,
+        key='home_period',
+        label_visibility='collapsed',
+    )
+    st.subheader(PERIODS[period])
     st.write(f'**기준: :blue-background[{data.chat_last}]**')
 
-    col = st.columns(4)
+    col = st.columns(len(METRICS))
+    metrics = data.metrics.compare(data.save_point.date(), period)
+    for field, (metric, (label, unit)) in zip(col, METRICS.items()):
+        size, ratio = metrics[metric]
+        dod_metric(
+            field=field,
+            label=label,
+            value=f'{size} {unit}',
+            delta=ratio,
+        )
 
-    # Chat
-    size, ratio = data.dod_calculator(
-        target_col='chat',
-    )
-    dod_metric(
-        field=col[0],
-        label='대화',
-        value=f'{size} 회',
-        delta=ratio,
-    )
-    # Activate Users
-    size, ratio = data.dod_calculator(
-        target_col='name',
-        unique=True,
-    )
-    dod_metric(
-        field=col[1],
-        label='참여자',
-        value=f'{size} 명',
-        delta=ratio,
-    )
-    # Enter
-    size, ratio = data.dod_calculator(
-        target_col='event',
-        target_val='들어왔습니다.',
-    )
-    dod_metric(
-        field=col[2],
-        label='유입',
-        value=f'{size} 명',
-        delta=ratio,
-    )
-    # Leave
-    size, ratio = data.dod_calculator(
-        target_col='event',
-        target_val=['나갔습니다.', '내보냈습니다.'],
-    )
-    dod_metric(
-        field=col[3],
-        label='이탈',
-        value=f'{size} 명',
-        delta=ratio,
+    # Trend
+    st.line_chart(
+        data.metrics.series(period).rename(
+            {metric: label for metric, (label, _) in METRICS.items()}
+        ).to_pandas().set_index('date'),
+        height=250,
+    )
+
+    # Membership
+    st.write('---')
+    st.subheader('월별 유입/이탈')
+    timeline = data.timeline()
+    monthly = timeline.monthly().to_pandas().set_index('월')
+    col = st.columns([0.6, 0.4])
+    col[0].bar_chart(monthly[['유입', '이탈']], height=250)
+    col[1].line_chart(
+        timeline.counts('1d').to_pandas().set_index('date'),
+        height=250,
+    )
+    at = st.date_input(
+        '기준 날짜',
+        format=date_format,
+        key='home_members_date',
+        value=data.end_point,
+        min_value=data.start_point,
+        max_value=data.end_point,
+    )
+    members = timeline.members_at(at)
+    with st.expander(f'{at} 인원: {len(members)} 명'):
+        st.write(', '.join(members))
+
+    # Heatmap
+    st.write('---')
+    st.subheader('활동 시간대')
+    col = st.columns([0.5, 0.5])
+    dates = col[0].date_input(
+        '조회 기간',
+        format=date_format,
+        key='home_heatmap_date',
+        value=[],
+        min_value=data.start_point,
+        max_value=data.end_point,
+    )
+    name = col[1].selectbox(
+        '유저',
+        [None] + data.names.to_list(),
+        format_func=lambda name: '전체' if name is None else name,
+        key='home_heatmap_name',
+    )
+    min_date, max_date = dates if len(dates) == 2 else (None, None)
+    st.altair_chart(
+        alt.Chart(data.heatmap(min_date, max_date, name)).mark_rect().encode(
+            x=alt.X('시간:O'),
+            y=alt.Y('요일:N', sort=WEEKDAYS),
+            color=alt.Color('대화 수:Q', scale=alt.Scale(scheme='blues')),
+            tooltip=['요일', '시간', '대화 수'],
+        ),
     )
 
     # Data
     st.write('---')
-    st.subheader('최근 대화 (100)')
+    st.subheader('최근 대화')
+    col = st.columns([0.25, 0.35, 0.2, 0.2])
+    dates = col[0].date_input(
+        '조회 기간',
+        format=date_format,
+        key='home_messages_date',
+        on_change=reset_page,
+        value=[],
+        min_value=data.start_point,
+        max_value=data.end_point,
+    )
+    names = col[1].multiselect(
+        '유저',
+        data.names.to_list(),
+        key='home_messages_names',
+        on_change=reset_page,
+    )
+    kinds = col[2].multiselect(
+        '종류',
+        list(MESSAGE_KINDS),
+        key='home_messages_kinds',
+        on_change=reset_page,
+    )
+    types = col[3].multiselect(
+        '유형',
+        list(TYPE_FILTERS)[1:],
+        key='home_messages_types',
+        on_change=reset_page,
+    )
+    query = st.text_input(
+        '검색',
+        key='home_messages_query',
+        placeholder='대화 내용 검색',
+        on_change=reset_page,
+        label_visibility='collapsed',
+    )
+    min_date, max_date = dates if len(dates) == 2 else (None, None)
+
+    page = st.session_state.get('home_messages_page', 1)
+    result, total = data.messages(
+        page=page,
+        page_size=page_size,
+        min_date=min_date,
+        max_date=max_date,
+        names=names,
+        kinds=kinds,
+        query=query,
+        types=types,
+    )
     st.dataframe(
-        data.df,
+        result,
         width=2000,
         height=350,
     )
+
+    col = st.columns([0.2, 0.8])
+    pages = max((total - 1) // page_size + 1, 1)
+    col[0].number_input(
+        '페이지',
+        min_value=1,
+        max_value=pages,
+        value=min(page, pages),
+        key='home_messages_page',
+        label_visibility='collapsed',
+    )
+    col[1].caption(f'{total} 개 중 {page} / {pages} 페이지')
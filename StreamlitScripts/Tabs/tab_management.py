@@ -1,7 +1,6 @@
 """ Management Tab """
 
 import streamlit as st
-import numpy as np
 
 from StreamlitModules import dod_metric, filter_block
 
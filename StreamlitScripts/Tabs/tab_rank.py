@@ -28,4 +28,39 @@ def main():
         )
         st.table(result)
 
-        top = result.head(5)
\ No newline at end of file
+        top = result.head(5)
+
+        # Conversation sessions
+        st.write('---')
+        st.subheader('대화 세션')
+        summary = data.session_summary(
+            min_date=st.session_state['rank_date'][0],
+            max_date=st.session_state['rank_date'][1],
+        )
+        columns = st.columns(len(summary))
+        for column, (label, value) in zip(columns, summary.items()):
+            column.metric(label, '-' if value is None else f'{value:,}')
+        st.table(data.session_users(
+            min_date=st.session_state['rank_date'][0],
+            max_date=st.session_state['rank_date'][1],
+        ))
+
+        # Keywords
+        st.write('---')
+        st.subheader('키워드')
+        name = st.selectbox(
+            '유저',
+            [None] + data.names.to_list(),
+            format_func=lambda name: '전체' if name is None else name,
+            key='rank_keyword_name',
+        )
+        st.table(data.keywords(
+            min_date=st.session_state['rank_date'][0],
+            max_date=st.session_state['rank_date'][1],
+            name=name,
+        ))
+
+        # Similar users
+        if name is not None:
+            st.subheader('비슷한 유저')
+            st.table(data.similar_users(name))
@@ -0,0 +1,165 @@
+"""ActivityCube Module"""
+
+import copy
+import threading
+from datetime import date
+from typing import Optional, Tuple
+
+import numpy as np
+import polars as pl
+
+from Utils.Text2DataFrame.KakaoTalk2DataFrame_Polars import OUT_EVENTS
+
+
+class ActivityCube:
+    '''
+    불러올 때 한 번 만드는 유저 × 날짜 활동 집계
+
+    daily에는 모든 유저의 날짜별 대화/입장/퇴장 수를, typed에는 대화 유형별
+    수를 담고, 현재 유저에 대해서는 날짜별 누적 대화 수와 마지막 대화일을
+    배열로 가지고 있어 기간 조회가 전체 대화 수가 아닌 유저 수에만 비례합니다.
+    유형별 배열은 처음 조회할 때 typed에서 만듭니다.
+
+    Parameters
+    ----------
+    df : pl.DataFrame
+        시간순으로 정렬된 대화
+    users : pl.DataFrame
+        현재 유저 (user_id, name)
+    '''
+
+    def __init__(self, df: pl.DataFrame, users: pl.DataFrame):
+        self.daily = df.lazy().group_by(['user_id', 'date']).agg(
+            pl.col('event').is_null().sum().alias('chats'),
+            (pl.col('event') == '들어왔습니다.').sum().alias('joins'),
+            pl.col('event').is_in(OUT_EVENTS).sum().alias('leaves'),
+        ).sort(['user_id', 'date']).collect()
+        self.typed = df.lazy().filter(pl.col('type').is_not_null()).group_by(
+            ['user_id', 'date', 'type']
+        ).len().rename({'len': 'chats'}).collect()
+
+        dates = df.get_column('date')
+        self.start = dates[0] if len(dates) else date.today()
+        self.days = (dates[-1] - self.start).days + 1 if len(dates) else 0
+        # 유형별 배열은 여러 세션이 동시에 채울 수 있어 잠금
+        self.__lock = threading.Lock()
+        self.__build(users)
+
+    def with_users(self, users: pl.DataFrame) -> 'ActivityCube':
+        '''
+        daily는 그대로 두고 유저만 바꾼 집계
+
+        Parameters
+        ----------
+        users : pl.DataFrame
+            user_id, name
+
+        Returns
+        -------
+        ActivityCube
+        '''
+        cube = copy.copy(self)
+        cube.__build(users)
+        return cube
+
+    def __build(self, users: pl.DataFrame) -> None:
+        '''
+        현재 유저의 누적 대화 수와 마지막 대화일 배열
+        '''
+        self.users = users
+        self.__arrays = {}
+        self.cum_chats, self.last_day = self.__dense(self.daily)
+
+    def __dense(self, daily: pl.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+        '''
+        (user_id, date, chats)에서 현재 유저의 누적 대화 수와 마지막 대화일
+
+        Returns
+        -------
+        cum_chats: np.ndarray
+            (유저 수, 날짜 수) 날짜별 누적 대화 수
+        last_day: np.ndarray
+            (유저 수, 날짜 수) 해당 날짜까지의 마지막 대화일 (날짜 번호, 없으면 -1)
+        '''
+        days = self.days
+
+        # 현재 유저의 날짜별 대화 수 (dense)
+        index = self.users.select(
+            pl.col('user_id'),
+            pl.int_range(0, pl.len(), dtype=pl.UInt32).alias('row'),
+        )
+        cells = daily.lazy().filter(pl.col('chats') > 0).join(
+            index.lazy(), on='user_id'
+        ).select(
+            pl.col('row'),
+            (pl.col('date') - pl.lit(self.start)).dt.total_days().alias('day'),
+            pl.col('chats'),
+        ).collect()
+        chats = np.zeros((len(self.users), days), dtype=np.int32)
+        rows = cells.get_column('row').to_numpy()
+        cols = cells.get_column('day').to_numpy()
+        chats[rows, cols] = cells.get_column('chats').to_numpy()
+
+        last = np.where(chats > 0, np.arange(days, dtype=np.int32), -1)
+        return (
+            chats.cumsum(axis=1, dtype=np.int64),
+            np.maximum.accumulate(last, axis=1),
+        )
+
+    def __typed_arrays(
+            self,
+            message_type: Optional[str],
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        '''
+        대화 유형별 누적 대화 수와 마지막 대화일 (None이면 전체)
+        '''
+        if message_type is None:
+            return self.cum_chats, self.last_day
+        with self.__lock:
+            if message_type not in self.__arrays:
+                self.__arrays[message_type] = self.__dense(
+                    self.typed.filter(pl.col('type') == message_type)
+                )
+            return self.__arrays[message_type]
+
+    def window(
+            self,
+            min_date: date,
+            max_date: date,
+            message_type: Optional[str] = None,
+    ) -> pl.DataFrame:
+        '''
+        기간 내 대화가 1회 이상인 현재 유저의 대화 수와 마지막 대화 날짜
+
+        Parameters
+        ----------
+        min_date: date
+        max_date: date
+        message_type: Optional, str
+            대화 유형 (MESSAGE_TYPES, None이면 전체)
+
+        Returns
+        -------
+        pl.DataFrame
+            user_id, name, 대화 빈도, 마지막 대화
+        '''
+        cum_chats, last_days = self.__typed_arrays(message_type)
+        days = cum_chats.shape[1]
+        first = max((min_date - self.start).days, 0)
+        last = min((max_date - self.start).days, days - 1)
+        if first > last:
+            counts = np.zeros(len(self.users), dtype=np.int64)
+            last_day = np.full(len(self.users), -1, dtype=np.int32)
+        else:
+            counts = cum_chats[:, last].copy()
+            if first > 0:
+                counts -= cum_chats[:, first - 1]
+            last_day = last_days[:, last]
+
+        epoch = (self.start - date(1970, 1, 1)).days
+        return self.users.with_columns(
+            pl.Series('대화 빈도', counts, dtype=pl.UInt32),
+            pl.Series('마지막 대화', last_day + epoch, dtype=pl.Int32),
+        ).filter(pl.col('대화 빈도') > 0).with_columns(
+            pl.col('마지막 대화').cast(pl.Date)
+        )
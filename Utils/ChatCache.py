@@ -0,0 +1,160 @@
+"""ChatCache Module"""
+
+import hashlib
+import os
+import shutil
+import tempfile
+from typing import Iterable, List, Optional, Tuple, Union
+
+from Utils.SearchIndex import SearchIndex
+from Utils.Text2DataFrame import KakaoTalk2DataFrame
+from Utils.Text2DataFrame import __version__ as parser_version
+
+DEFAULT_ROOT = os.path.join(os.path.expanduser('~'), '.cache', 'kakaotalk-tok')
+
+
+class ChatCache:
+    '''
+    파싱 결과를 Parquet로 보관하는 로컬 캐시
+
+    대화 파일 내용과 파서 버전의 해시를 키로 사용하며,
+    전체 용량이 max_bytes를 넘으면 가장 오래 사용하지 않은 항목부터 지웁니다.
+
+    Parameters
+    ----------
+    root : str, default ~/.cache/kakaotalk-tok
+        캐시 폴더
+    max_bytes : int, default 1G
+        캐시 최대 용량
+    '''
+
+    def __init__(self, root: str = DEFAULT_ROOT, max_bytes: int = 1 << 30):
+        self.root = root
+        self.max_bytes = max_bytes
+        os.makedirs(root, exist_ok=True)
+
+    @staticmethod
+    def key(buffer: Union[bytes, memoryview]) -> str:
+        '''
+
+        Parameters
+        ----------
+        buffer: bytes, memoryview
+            대화 파일 내용
+
+        Returns
+        -------
+        key: str
+        '''
+        digest = hashlib.sha256(parser_version.encode('utf-8'))
+        digest.update(buffer)
+        return digest.hexdigest()
+
+    def get(
+            self,
+            key: str,
+            not_user: List[str],
+            bot_used: bool,
+            aliases: Optional[Iterable[Tuple[str, str]]] = None,
+    ) -> Optional[KakaoTalk2DataFrame]:
+        '''
+
+        Parameters
+        ----------
+        key: str
+        not_user: List[str]
+        bot_used: bool
+        aliases: Optional, Iterable[Tuple[str, str]]
+            같은 사람의 (이전 이름, 이후 이름)
+
+        Returns
+        -------
+        chat: Optional[KakaoTalk2DataFrame]
+            캐시에 없으면 None
+        '''
+        path = os.path.join(self.root, key)
+        if not os.path.isdir(path):
+            return None
+        # 마지막 사용 시각 갱신 (LRU)
+        os.utime(path)
+        return KakaoTalk2DataFrame.load(
+            path,
+            not_user=not_user,
+            bot_used=bot_used,
+            aliases=aliases,
+        )
+
+    def put(self, key: str, chat: KakaoTalk2DataFrame) -> None:
+        '''
+
+        Parameters
+        ----------
+        key: str
+        chat: KakaoTalk2DataFrame
+        '''
+        path = os.path.join(self.root, key)
+        if os.path.isdir(path):
+            os.utime(path)
+            return
+
+        # 다른 프로세스가 반쯤 쓴 항목을 읽지 않도록 임시 폴더에 쓰고 이동
+        tmp = tempfile.mkdtemp(prefix='.tmp-', dir=self.root)
+        try:
+            chat.save(tmp)
+            os.replace(tmp, path)
+        except OSError:
+            shutil.rmtree(tmp, ignore_errors=True)
+            if not os.path.isdir(path):
+                raise
+        self.__evict()
+
+    def get_index(self, key: str) -> Optional[SearchIndex]:
+        '''
+        파싱 결과 옆에 저장된 검색 색인
+
+        Parameters
+        ----------
+        key: str
+
+        Returns
+        -------
+        index: Optional[SearchIndex]
+            저장된 색인이 없으면 None
+        '''
+        return SearchIndex.load(os.path.join(self.root, key, 'search.npz'))
+
+    def put_index(self, key: str, index: SearchIndex) -> None:
+        '''
+
+        Parameters
+        ----------
+        key: str
+        index: SearchIndex
+        '''
+        path = os.path.join(self.root, key)
+        if not os.path.isdir(path):
+            return
+        index.save(os.path.join(path, 'search.npz'))
+        self.__evict()
+
+    def __evict(self) -> None:
+        '''
+        용량을 넘으면 오래 사용하지 않은 항목부터 삭제
+        '''
+        entries = []
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name)
+            if name.startswith('.') or not os.path.isdir(path):
+                continue
+            size = sum(
+                os.path.getsize(os.path.join(path, file))
+                for file in os.listdir(path)
+            )
+            entries.append((os.path.getmtime(path), size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
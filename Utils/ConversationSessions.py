@@ -0,0 +1,169 @@
+"""ConversationSessions Module"""
+
+from datetime import date, timedelta
+from typing import Optional
+
+import polars as pl
+
+from Utils.DateIndex import date_bounds
+
+# 이 시간보다 오래 대화가 없으면 새 대화(세션)로 나눔
+SESSION_GAP = timedelta(minutes=30)
+
+
+class ConversationSessions:
+    '''
+    대화 공백으로 나눈 대화 세션과 응답 시간
+
+    시간순 대화에서 앞 대화와의 간격이 gap보다 크면 새 세션을 시작합니다
+    (간격 비교 → 누적합 한 번). 같은 세션에서 앞 사람과 다른 유저가 한
+    대화는 앞 대화에 대한 응답으로 보고 그 간격을 응답 시간으로 둡니다.
+    messages는 대화 단위(날짜순), sessions는 세션 단위(시작순)로 정렬되어
+    있어 기간 조회는 이진 탐색으로 자른 뒤 group_by만 합니다.
+
+    Parameters
+    ----------
+    df : pl.DataFrame
+        시간순으로 정렬된 대화
+    gap : timedelta, default 30분
+    '''
+
+    def __init__(self, df: pl.DataFrame, gap: timedelta = SESSION_GAP):
+        self.gap = gap
+        interval = pl.col('all_date').diff()
+        new_session = interval.is_null() | (interval > gap)
+
+        # (all_date, date, user_id, session, reply 초), 시간순
+        self.messages = df.lazy().filter(pl.col('kind') == 'chat').select(
+            pl.col('all_date'),
+            pl.col('date'),
+            pl.col('user_id'),
+            (new_session.cum_sum() - 1).cast(pl.UInt32).alias('session'),
+            pl.when(
+                ~new_session & (pl.col('user_id') != pl.col('user_id').shift(1))
+            ).then(interval.dt.total_seconds()).alias('reply'),
+        ).collect()
+
+        # (session, date, start, end, messages, participants, starter, minutes)
+        self.sessions = self.messages.lazy().group_by(
+            'session', maintain_order=True
+        ).agg(
+            pl.col('date').first(),
+            pl.col('all_date').first().alias('start'),
+            pl.col('all_date').last().alias('end'),
+            pl.len().alias('messages'),
+            pl.col('user_id').n_unique().alias('participants'),
+            pl.col('user_id').first().alias('starter'),
+        ).with_columns(
+            (pl.col('end') - pl.col('start')).dt.total_minutes()
+            .alias('minutes')
+        ).collect()
+
+    def window(
+            self,
+            min_date: Optional[date] = None,
+            max_date: Optional[date] = None,
+    ) -> pl.DataFrame:
+        '''
+        기간 내에 시작한 세션
+
+        Parameters
+        ----------
+        min_date: Optional, date
+        max_date: Optional, date
+
+        Returns
+        -------
+        pl.DataFrame
+            session, date, start, end, messages, participants, starter, minutes
+        '''
+        start, end = date_bounds(
+            self.sessions.get_column('date'), min_date, max_date
+        )
+        return self.sessions.slice(start, end - start)
+
+    def users(
+            self,
+            min_date: Optional[date] = None,
+            max_date: Optional[date] = None,
+    ) -> pl.DataFrame:
+        '''
+        기간 내 유저별 대화 시작, 참여, 응답 시간
+
+        Parameters
+        ----------
+        min_date: Optional, date
+        max_date: Optional, date
+
+        Returns
+        -------
+        pl.DataFrame
+            user_id, started (시작한 세션), sessions (참여한 세션),
+            reply (응답 시간 중앙값, 초), replies (응답 수),
+            minutes (참여한 세션의 평균 길이, 분)
+        '''
+        start, end = date_bounds(
+            self.messages.get_column('date'), min_date, max_date
+        )
+        messages = self.messages.lazy().slice(start, end - start)
+        sessions = self.window(min_date, max_date).lazy()
+        # 기간 전에 시작한 세션도 포함하도록 세션 번호(= sessions 행 번호)로 자름
+        first, last = 0, -1
+        if start < end:
+            ids = self.messages.get_column('session')
+            first, last = ids[start], ids[end - 1]
+        joined_sessions = self.sessions.lazy().slice(first, last - first + 1)
+
+        started = sessions.group_by(
+            pl.col('starter').alias('user_id')
+        ).agg(pl.len().cast(pl.UInt32).alias('started'))
+        joined = messages.select('user_id', 'session').unique().join(
+            joined_sessions.select('session', 'minutes'),
+            on='session',
+            how='left',
+        ).group_by('user_id').agg(
+            pl.len().cast(pl.UInt32).alias('sessions'),
+            pl.col('minutes').mean(),
+        )
+        replies = messages.group_by('user_id').agg(
+            pl.col('reply').median(),
+            pl.col('reply').count().cast(pl.UInt32).alias('replies'),
+        )
+        return joined.join(replies, on='user_id', how='left').join(
+            started, on='user_id', how='left'
+        ).select(
+            pl.col('user_id'),
+            pl.col('started').fill_null(0),
+            pl.col('sessions'),
+            pl.col('reply'),
+            pl.col('replies'),
+            pl.col('minutes'),
+        ).collect()
+
+    def summary(
+            self,
+            min_date: Optional[date] = None,
+            max_date: Optional[date] = None,
+    ) -> pl.DataFrame:
+        '''
+        기간 내 세션 수, 평균 세션 길이, 응답 시간 중앙값
+
+        Parameters
+        ----------
+        min_date: Optional, date
+        max_date: Optional, date
+
+        Returns
+        -------
+        pl.DataFrame
+            sessions, minutes (평균, 분), reply (중앙값, 초) 한 행
+        '''
+        start, end = date_bounds(
+            self.messages.get_column('date'), min_date, max_date
+        )
+        reply = self.messages.get_column('reply').slice(start, end - start)
+        return self.window(min_date, max_date).select(
+            pl.len().cast(pl.UInt32).alias('sessions'),
+            pl.col('minutes').mean(),
+            pl.lit(reply.median(), dtype=pl.Float64).alias('reply'),
+        )
@@ -1,46 +1,246 @@
 """DataControl Module"""
 
-from io import StringIO
-from typing import Union, Optional
-from datetime import datetime
-import pandas as pd
+import copy
+import threading
+from collections import OrderedDict
+from typing import Callable, Hashable, Iterable, List, Optional, Tuple
+from datetime import date, datetime
 import numpy as np
+import pandas as pd
+import polars as pl
 from streamlit.runtime.uploaded_file_manager import UploadedFile
 
+from Utils.ActivityCube import ActivityCube
+from Utils.ChatCache import ChatCache
+from Utils.ConversationSessions import ConversationSessions
+from Utils.DateIndex import date_bounds
+from Utils.HourlyCube import HourlyCube
+from Utils.Keywords import Keywords
+from Utils.MembershipTimeline import MembershipTimeline
+from Utils.PeriodMetrics import PeriodMetrics
+from Utils.RoomStore import RoomStore
+from Utils.SearchIndex import SearchIndex
+from Utils.SimilarUsers import SimilarUsers
 from Utils.Text2DataFrame import KakaoTalk2DataFrame
 
+# 대화 종류별 kind (EventKind)
+MESSAGE_KINDS = {
+    '대화': pl.col('kind').is_in(['chat', 'unknown']),
+    '입장': pl.col('kind') == 'join',
+    '퇴장': pl.col('kind').is_in(['leave', 'kick']),
+    '기타': pl.col('kind').is_in(['hide', 'role', 'other']),
+}
+# '조회 대상' 이름별 대화 유형 (MessageType, None이면 전체)
+TYPE_FILTERS = {
+    '전체': None,
+    '텍스트': 'text',
+    '사진': 'photo',
+    '동영상': 'video',
+    '이모티콘': 'emoticon',
+    '파일': 'file',
+    '링크': 'link',
+    '삭제됨': 'deleted',
+}
+
 
 class DataHandler:
     '''
     DataHendler Class
     '''
 
-    def __init__(self, data: UploadedFile, bot_used: bool):
-        data = StringIO(data.getvalue().decode('utf-8'))
-
-        not_users = ['', '채팅방 관리자']
-        if bot_used:
-            not_users += ['방장봇']
-
-        self.data = KakaoTalk2DataFrame(
-            path=data,
-            ispath=False,
-            bot_used=bot_used,
-            not_user=not_users,
-        )
-
-        # Convert Pandas
-        self.df = self.data.data.to_pandas()
+    def __init__(
+            self,
+            data: UploadedFile,
+            bot_used: bool,
+            cache: Optional[ChatCache] = None,
+            store: Optional[RoomStore] = None,
+            query_cache_size: int = 64,
+            aliases: Optional[Iterable[Tuple[str, str]]] = None,
+            key: Optional[str] = None,
+    ):
+        not_users = self.__not_users(bot_used)
+
+        # 업로드 버퍼를 복사하지 않고 그대로 파싱
+        with data.getbuffer() as buffer:
+            self.data, key = self.__load(
+                buffer, bot_used, not_users, cache, store, aliases, key
+            )
+
+        self.df = self.data.data
+        # 날짜 구간을 이진 탐색으로 자르기 위해 시간순 정렬 보장
+        if not self.df.get_column('all_date').is_sorted():
+            # 같은 시각의 대화 순서를 유지하도록 행 번호를 보조 키로 사용
+            self.df = self.df.with_row_index('row').sort(
+                ['all_date', 'row']
+            ).drop('row')
 
         # Info
         self.title = self.data.title
         self.save_point = self.data.save_point
         self.start_point, self.end_point = self.__date_point()
-        self.users = self.data.users.to_numpy()
+        self.bot_used = bot_used
+        # 집계는 이름이 아닌 user_id 기준 (이름을 바꾼 유저는 대표 이름으로 표시)
+        self.identities = self.data.identities
+        self.users = self.data.users
+        self.cube = ActivityCube(self.df, self.__members(self.users))
+        self.names = self.identities.get_column('name').sort()
+        self.metrics = PeriodMetrics(self.df)
+        self.__user_last = self.__user_summary()
         self.user_size = self.data.participants_num
         self.chat_size = self.__chat_size()
         self.chat_last = self.data.data.tail(1)['date'][0]
 
+        # 검색 색인, 키워드 행렬은 처음 쓸 때 만듦 (설정을 바꿔도 공유)
+        # 검색 색인은 누적 저장소면 채팅방 폴더에, 아니면 파싱 캐시에 저장
+        self.__cache = store if store is not None else cache
+        self.__cache_key = key
+        self.__lazy = {}
+        self.__similar = None
+        self.__timeline = None
+        # 여러 세션(스크립트 스레드)이 같은 DataHandler를 공유하므로
+        # 캐시를 채우고 읽는 동안 잠금 (설정을 바꾼 복사본과도 공유)
+        self.__lock = threading.RLock()
+
+        # 조회 결과 캐시 (LRU)
+        self.__queries = OrderedDict()
+        self.__query_cache_size = query_cache_size
+
+    def estimated_size(self) -> int:
+        '''
+        대화와 지금까지 만든 집계, 색인, 조회 캐시의 대략적인 메모리 크기
+
+        속성을 따라가며 DataFrame, Series, 배열 크기를 더하고, 여러 곳에서
+        가리키는 객체(설정을 바꾼 복사본과 공유하는 집계 등)는 한 번만 셉니다.
+
+        Returns
+        -------
+        int
+            bytes
+        '''
+        with self.__lock:
+            return self.__nbytes(self, set())
+
+    @classmethod
+    def __nbytes(cls, value: object, seen: set) -> int:
+        if id(value) in seen:
+            return 0
+        seen.add(id(value))
+        if isinstance(value, (pl.DataFrame, pl.Series)):
+            return value.estimated_size()
+        if isinstance(value, np.ndarray):
+            return value.nbytes
+        if isinstance(value, pd.DataFrame):
+            return int(value.memory_usage(deep=True).sum())
+        if isinstance(value, dict):
+            values = value.values()
+        elif isinstance(value, (list, tuple)):
+            values = value
+        elif hasattr(value, '__dict__') and not isinstance(value, type):
+            values = vars(value).values()
+        else:
+            return 0
+        return sum(cls.__nbytes(item, seen) for item in values)
+
+    @staticmethod
+    def __not_users(bot_used: bool) -> list:
+        not_users = ['', '채팅방 관리자']
+        if bot_used:
+            not_users += ['방장봇']
+        return not_users
+
+    def with_settings(self, bot_used: bool) -> 'DataHandler':
+        '''
+        다시 파싱하지 않고 설정만 바꾼 DataHandler
+
+        대화와 기간별 집계는 공유하고, 유저 목록과 그에 따른 값만 다시 계산합니다.
+
+        Parameters
+        ----------
+        bot_used: bool
+
+        Returns
+        -------
+        DataHandler
+        '''
+        if bot_used == self.bot_used:
+            return self
+
+        handler = copy.copy(self)
+        handler.bot_used = bot_used
+        handler.users = self.data.current_users(self.__not_users(bot_used))
+        handler.user_size = self.user_size + self.bot_used - bot_used
+        handler.cube = self.cube.with_users(handler.__members(handler.users))
+        handler.__user_last = handler.__user_summary()
+        handler.__queries = OrderedDict()
+        handler.__similar = None
+        handler.__timeline = None
+        return handler
+
+    @staticmethod
+    def __load(
+            buffer: memoryview,
+            bot_used: bool,
+            not_users: list,
+            cache: Optional[ChatCache],
+            store: Optional[RoomStore],
+            aliases: Optional[Iterable[Tuple[str, str]]],
+            key: Optional[str],
+    ) -> Tuple[KakaoTalk2DataFrame, Optional[str]]:
+        '''
+
+        Parameters
+        ----------
+        buffer: memoryview
+        bot_used: bool
+        not_users: list
+        cache: Optional, ChatCache
+            같은 파일이면 파싱하지 않고 캐시에서 불러옴
+        store: Optional, RoomStore
+            같은 채팅방의 이전 내보내기에 새 대화만 덧붙임
+        aliases: Optional, Iterable[Tuple[str, str]]
+            같은 사람의 (이전 이름, 이후 이름)
+        key: Optional, str
+            이미 계산한 캐시 키 (없으면 버퍼를 해시)
+
+        Returns
+        -------
+        data: KakaoTalk2DataFrame
+        key: Optional, str
+            캐시 키 (누적 저장소면 검색 색인 키, 캐시를 쓰지 않으면 None)
+        '''
+        if store is not None:
+            data = store.ingest(
+                buffer,
+                not_user=not_users,
+                bot_used=bot_used,
+                aliases=aliases,
+            )
+            return data, store.index_key(data.title)
+
+        if cache is None:
+            key = None
+        elif key is None:
+            key = cache.key(buffer)
+        if cache is not None:
+            data = cache.get(
+                key,
+                not_user=not_users,
+                bot_used=bot_used,
+                aliases=aliases,
+            )
+            if data is not None:
+                return data, key
+
+        data = KakaoTalk2DataFrame(
+            path=buffer,
+            bot_used=bot_used,
+            not_user=not_users,
+            aliases=aliases,
+        )
+        if key is not None:
+            cache.put(key, data)
+        return data, key
+
     def __chat_size(self) -> int:
         '''
 
@@ -48,7 +248,7 @@ class DataHandler:
         -------
         chat_size: int
         '''
-        chat_size = self.df['chat'].notna().sum()
+        chat_size = self.df.get_column('chat').is_not_null().sum()
         return chat_size
 
     def __date_point(self):
@@ -56,71 +256,474 @@ class DataHandler:
 
         Returns
         -------
+        start_date: date
+        end_date: date
+        '''
+        dates = self.df.get_column('date')
+        return dates[0], dates[-1]
 
+    def __members(self, users: pl.Series) -> pl.DataFrame:
         '''
-        start_date = self.df['date'].head(1).values[0].astype(datetime)
-        end_date = self.df['date'].tail(1).values[0].astype(datetime)
-        return start_date, end_date
+        유저 이름에 user_id를 붙임
 
-    def dod_calculator(
+        Returns
+        -------
+        pl.DataFrame
+            user_id, name
+        '''
+        return self.identities.filter(pl.col('name').is_in(users))
+
+    def __user_ids(self, names: List[str]) -> pl.Series:
+        '''
+        대화에 쓰인 이름(이전 이름 포함)의 user_id
+        '''
+        return self.data.aliases.filter(
+            pl.col('name').is_in(names)
+        ).get_column('user_id').unique()
+
+    def __user_id(self, name: Optional[str]) -> Optional[int]:
+        '''
+        이름의 user_id (None이면 전체이므로 None)
+        '''
+        if name is None:
+            return None
+        ids = self.__user_ids([name])
+        # 없는 이름은 어떤 유저와도 맞지 않는 번호
+        return ids[0] if len(ids) else len(self.identities)
+
+    def __user_summary(self) -> pl.DataFrame:
+        '''
+        기간과 무관한 유저별 정보 (전체 기간 마지막 대화 날짜, 입장 기록 여부)
+
+        Returns
+        -------
+        pl.DataFrame
+            user_id, name, 마지막 대화, 입장
+        '''
+        return self.cube.daily.lazy().join(
+            self.cube.users.lazy(), on='user_id'
+        ).group_by('user_id', 'name').agg(
+            pl.col('date').max().alias('마지막 대화'),
+            (pl.col('joins').sum() > 0).alias('입장'),
+        ).collect()
+
+    def search_index(self) -> SearchIndex:
+        '''
+        대화 내용 검색 색인
+
+        캐시나 누적 저장소를 쓰면 파싱 결과 옆에 저장해 두고 다음 로드부터
+        불러옵니다.
+
+        Returns
+        -------
+        SearchIndex
+        '''
+        def build() -> SearchIndex:
+            index = None
+            if self.__cache_key is not None:
+                index = self.__cache.get_index(self.__cache_key)
+            if index is None:
+                index = SearchIndex.build(self.df.get_column('chat'))
+                if self.__cache_key is not None:
+                    self.__cache.put_index(self.__cache_key, index)
+            return index
+
+        return self.__shared('index', build)
+
+    def __shared(self, name: str, build: Callable[[], object]) -> object:
+        '''
+        처음 쓸 때 한 번만 만드는 설정과 무관한 집계
+
+        Parameters
+        ----------
+        name: str
+        build: Callable
+            없을 때 만드는 함수 (같은 집계를 동시에 두 번 만들지 않도록 잠금)
+
+        Returns
+        -------
+        object
+        '''
+        with self.__lock:
+            if name not in self.__lazy:
+                self.__lazy[name] = build()
+            return self.__lazy[name]
+
+    def __keywords(self) -> Keywords:
+        return self.__shared('keywords', lambda: Keywords(self.df))
+
+    def __hourly(self) -> HourlyCube:
+        return self.__shared('hourly', lambda: HourlyCube(self.df))
+
+    def __sessions(self) -> ConversationSessions:
+        return self.__shared(
+            'sessions', lambda: ConversationSessions(self.df)
+        )
+
+    def session_summary(self, min_date, max_date) -> dict:
+        '''
+        기간 내 대화 세션 수, 평균 세션 길이, 응답 시간 중앙값
+
+        Parameters
+        ----------
+        min_date: date
+        max_date: date
+
+        Returns
+        -------
+        dict
+            세션 수, 평균 길이(분), 응답 시간(분)
+        '''
+        min_date = self.__to_date(min_date)
+        max_date = self.__to_date(max_date)
+        return self.__query(
+            ('session_summary', min_date, max_date),
+            lambda: self.__sessions().summary(min_date, max_date),
+        ).select(
+            pl.col('sessions').alias('세션 수'),
+            pl.col('minutes').round(1).alias('평균 길이(분)'),
+            (pl.col('reply') / 60).round(1).alias('응답 시간(분)'),
+        ).row(0, named=True)
+
+    def session_users(self, min_date, max_date, k: int = 20) -> pd.DataFrame:
+        '''
+        기간 내 대화를 많이 시작한 유저의 세션 참여와 응답 시간
+
+        세션은 30분 이상 대화가 없으면 나누며, 응답 시간은 같은 세션에서
+        다른 유저의 대화 뒤에 대화하기까지 걸린 시간의 중앙값입니다.
+
+        Parameters
+        ----------
+        min_date: date
+        max_date: date
+        k: int, default 20
+
+        Returns
+        -------
+        pd.DataFrame
+            유저, 시작한 대화, 참여한 대화, 응답 시간(분), 평균 대화 길이(분)
+        '''
+        min_date = self.__to_date(min_date)
+        max_date = self.__to_date(max_date)
+
+        result_df = self.__query(
+            ('session_users', min_date, max_date, k),
+            lambda: self.__sessions().users(min_date, max_date).join(
+                self.cube.users, on='user_id'
+            ).select(
+                pl.col('name').alias('유저'),
+                pl.col('started').alias('시작한 대화'),
+                pl.col('sessions').alias('참여한 대화'),
+                (pl.col('reply') / 60).round(1).alias('응답 시간(분)'),
+                pl.col('minutes').round(1).alias('평균 대화 길이(분)'),
+            ).sort(
+                ['시작한 대화', '참여한 대화', '유저'],
+                descending=[True, True, False],
+            ).head(k),
+        )
+
+        result_df = result_df.to_pandas()
+        result_df.index += 1
+        return result_df
+
+    def heatmap(
+            self,
+            min_date=None,
+            max_date=None,
+            name: Optional[str] = None,
+    ) -> pd.DataFrame:
+        '''
+        요일 × 시간 대화 수
+
+        Parameters
+        ----------
+        min_date: Optional, date
+        max_date: Optional, date
+        name: Optional, str
+            유저 (None이면 전체)
+
+        Returns
+        -------
+        pd.DataFrame
+            요일, 시간, 대화 수
+        '''
+        if min_date is not None:
+            min_date = self.__to_date(min_date)
+        if max_date is not None:
+            max_date = self.__to_date(max_date)
+        return self.__hourly().heatmap(
+            min_date, max_date, self.__user_id(name)
+        ).to_pandas()
+
+    def timeline(self) -> MembershipTimeline:
+        '''
+        유저별 참여 구간 (특정 시점 인원, 월별 유입/이탈)
+
+        Returns
+        -------
+        MembershipTimeline
+        '''
+        with self.__lock:
+            if self.__timeline is None:
+                self.__timeline = MembershipTimeline(
+                    self.df,
+                    self.identities,
+                    not_user=self.__not_users(self.bot_used),
+                    end=self.save_point,
+                )
+            return self.__timeline
+
+    def similar_users(self, name: str, k: int = 5) -> pd.DataFrame:
+        '''
+        대화 내용, 활동 시간대, 활동량이 비슷한 유저
+
+        Parameters
+        ----------
+        name: str
+        k: int, default 5
+
+        Returns
+        -------
+        pd.DataFrame
+            유저, 유사도 (현재 유저가 아니면 빈 결과)
+        '''
+        with self.__lock:
+            if self.__similar is None:
+                self.__similar = SimilarUsers(
+                    self.__hourly(), self.__keywords(), self.cube.users
+                )
+            similar = self.__similar
+        result_df = similar.similar(name, k).to_pandas()
+        result_df.index += 1
+        return result_df
+
+    def keywords(
+            self,
+            min_date=None,
+            max_date=None,
+            name: Optional[str] = None,
+            k: int = 20,
+    ) -> pd.DataFrame:
+        '''
+        기간(또는 기간 내 한 유저)의 TF-IDF 상위 키워드
+
+        Parameters
+        ----------
+        min_date: Optional, date
+        max_date: Optional, date
+        name: Optional, str
+            유저 (None이면 전체)
+        k: int, default 20
+
+        Returns
+        -------
+        pd.DataFrame
+            키워드, 빈도, 점수
+        '''
+        if min_date is not None:
+            min_date = self.__to_date(min_date)
+        if max_date is not None:
+            max_date = self.__to_date(max_date)
+        result_df = self.__keywords().top(
+            k,
+            min_date=min_date,
+            max_date=max_date,
+            user_id=self.__user_id(name),
+        ).to_pandas()
+        result_df.index += 1
+        return result_df
+
+    @staticmethod
+    def __to_date(value) -> date:
+        '''
+        date_input 값(date, datetime, 'YYYY-MM-DD')을 date로 변환
+        '''
+        if isinstance(value, datetime):
+            return value.date()
+        if isinstance(value, str):
+            return date.fromisoformat(value)
+        return value
+
+    def __chat_count(
+            self,
+            min_date: date,
+            max_date: date,
+            message_type: Optional[str] = None,
+    ) -> pl.LazyFrame:
+        '''
+        기간 내 유저별 대화 수와 마지막 대화 날짜 (대화 0회 유저 포함)
+
+        Parameters
+        ----------
+        min_date: date
+        max_date: date
+        message_type: Optional, str
+            대화 유형 (None이면 전체)
+
+        Returns
+        -------
+        pl.LazyFrame
+            user_id, 유저, 대화 빈도, 마지막 대화
+        '''
+        users = self.__user_last.lazy()
+
+        # 기준일 부터 대화 1회 이상 인원
+        active = self.cube.window(min_date, max_date, message_type).lazy()
+
+        # 기준일 부터 대화 0회 인원
+        chat_zero_users = users.join(
+            active, on='user_id', how='anti'
+        ).select(
+            pl.col('user_id'),
+            pl.col('name'),
+            pl.lit(0, dtype=pl.UInt32).alias('대화 빈도'),
+            pl.col('마지막 대화'),
+        )
+
+        return pl.concat([active, chat_zero_users]).rename({'name': '유저'})
+
+    def __query(
+            self,
+            key: Hashable,
+            compute: Callable[[], pl.DataFrame],
+    ) -> pl.DataFrame:
+        '''
+        같은 조건의 조회는 다시 계산하지 않고 캐시된 결과를 사용
+
+        Parameters
+        ----------
+        key: Hashable
+            (조회 종류, min_date, max_date, ...)
+        compute: Callable
+            캐시에 없을 때 결과를 계산하는 함수
+
+        Returns
+        -------
+        pl.DataFrame
+        '''
+        with self.__lock:
+            if key in self.__queries:
+                self.__queries.move_to_end(key)
+                return self.__queries[key]
+
+        # 계산은 잠금 밖에서 (같은 조회가 겹치면 두 번 계산할 수 있음)
+        result = compute()
+        with self.__lock:
+            self.__queries[key] = result
+            if len(self.__queries) > self.__query_cache_size:
+                self.__queries.popitem(last=False)
+        return result
+
+    def messages(
             self,
-            target_col: str,
-            target_val: Optional[Union[str, list]] = None,
-            unique: bool = False,
-    ) -> Union[int, str]:
+            page: int = 1,
+            page_size: int = 100,
+            min_date=None,
+            max_date=None,
+            names: Optional[List[str]] = None,
+            kinds: Optional[List[str]] = None,
+            query: str = '',
+            types: Optional[List[str]] = None,
+    ) -> Tuple[pd.DataFrame, int]:
         '''
+        최신 대화부터 page_size 개씩 나눈 한 페이지
+
+        기간은 이진 탐색으로 자르고 유저/종류로 거른 뒤,
+        요청한 페이지만 pandas로 변환합니다.
 
         Parameters
         ----------
-        target_col: str
-            target colume name
-        target_val: Optional, [str, list]
-            target colume value
-            If None get all
-        unique: bool, default False
+        page: int, default 1
+        page_size: int, default 100
+        min_date: Optional, date
+        max_date: Optional, date
+        names: Optional, List[str]
+            유저 (None이면 전체)
+        kinds: Optional, List[str]
+            MESSAGE_KINDS의 키 (None이면 전체)
+        query: str, default ''
+            대화 내용 검색어 (검색 색인 사용)
+        types: Optional, List[str]
+            TYPE_FILTERS의 키 (None이면 전체)
 
         Returns
         -------
-        today_size: int
-        ratio: str
-        '''
-        today = pd.to_datetime(self.save_point)
-        today = today.date() + pd.DateOffset(days=0)
-        yesterday = today - pd.DateOffset(days=1)
-
-        today_df = self.df[self.df['date'].isin([today])]
-        yesterday_df = self.df[self.df['date'].isin([yesterday])]
-
-        # Filter
-        if isinstance(target_val, str):
-            today_size = today_df[target_col].isin([target_val])
-            yesterday_size = yesterday_df[target_col].isin([target_val])
-        elif isinstance(target_val, list):
-            today_size = today_df[target_col].isin(target_val)
-            yesterday_size = yesterday_df[target_col].isin(target_val)
-        elif unique:
-            today_size = ~ today_df.loc[
-                today_df['chat'].notna(), target_col
-            ].duplicated()
-            yesterday_size = ~ yesterday_df.loc[
-                yesterday_df['chat'].notna(), target_col
-            ].duplicated()
+        page_df: pd.DataFrame
+        total: int
+            조건에 맞는 전체 대화 수
+        '''
+        min_date = self.__to_date(min_date or self.start_point)
+        max_date = self.__to_date(max_date or self.end_point)
+        names = tuple(names or ())
+        kinds = tuple(kinds or ())
+        types = tuple(
+            TYPE_FILTERS[name] for name in types or () if TYPE_FILTERS[name]
+        )
+
+        def compute() -> pl.Series:
+            # 조건에 맞는 행 번호만 캐시 (대화 DataFrame을 복사하지 않음)
+            condition = pl.lit(True)
+            if names:
+                condition &= pl.col('user_id').is_in(
+                    self.__user_ids(list(names))
+                )
+            if kinds:
+                condition &= pl.any_horizontal(
+                    MESSAGE_KINDS[kind] for kind in kinds
+                )
+            if types:
+                condition &= pl.col('type').is_in(types)
+            condition = condition.fill_null(False)
+
+            start, end = date_bounds(self.df.get_column('date'), min_date, max_date)
+            if query:
+                rows = pl.Series('row', self.search_index().search(
+                    self.df.get_column('chat'), query, start, end
+                ), dtype=pl.UInt32)
+                matched = self.df.select(
+                    pl.col('user_id', 'kind', 'type').gather(rows)
+                ).select(condition).to_series()
+                return rows.filter(matched)
+            return self.df.slice(start, end - start).select(
+                pl.arg_where(condition).cast(pl.UInt32) + start
+            ).to_series().alias('row')
+
+        if names or kinds or query or types:
+            rows = self.__query(
+                ('messages', min_date, max_date, names, kinds, query, types),
+                compute,
+            )
+            total = len(rows)
         else:
-            today_size = today_df[target_col].notna()
-            yesterday_size = yesterday_df[target_col].notna()
-        today_size = today_size.sum()
-        yesterday_size = yesterday_size.sum()
-
-        # DoD
-        if not yesterday_size:
-            result = (today_size - yesterday_size)
-        elif today_size == yesterday_size:
-            result = 0
+            # 조건이 없으면 기간의 행 범위 그대로
+            rows = None
+            first, last = date_bounds(self.df.get_column('date'), min_date, max_date)
+            total = last - first
+
+        end = max(total - (page - 1) * page_size, 0)
+        start = max(end - page_size, 0)
+        if rows is None:
+            page_rows = self.df.slice(first + start, end - start)
         else:
-            result = (today_size - yesterday_size) / yesterday_size
-        ratio = f'{result:.2%}'
-
-        return today_size, ratio
+            page_rows = self.df.select(
+                pl.all().gather(rows.slice(start, end - start))
+            )
+        page_df = page_rows.reverse().select(
+            pl.col('date', 'time', 'name', 'event', 'chat')
+        ).to_pandas()
+        # 최신 대화부터 1번
+        page_df.index = range(total - end + 1, total - start + 1)
+        return page_df, total
+
+    @staticmethod
+    def __days_ago(base: date) -> pl.Expr:
+        '''
+        마지막 대화를 'N일 전' / '오늘' 문자열로 변환
+        '''
+        days = (pl.lit(base) - pl.col('마지막 대화')).dt.total_days()
+        return pl.when(days == 0).then(pl.lit('오늘')).otherwise(
+            days.cast(pl.Utf8).str.pad_start(2) + '일 전'
+        ).alias('마지막 대화')
 
     def death_note(
             self,
@@ -131,77 +734,37 @@ class DataHandler:
             sort_key: str,
             ascending: bool,
     ) -> pd.DataFrame:
-        min_date = pd.to_datetime(min_date, format=date_format)
-        max_date = pd.to_datetime(max_date, format=date_format)
-        date_range = pd.date_range(
-            start=min_date,
-            end=max_date,
-        )
-        # Filter
-        result_df = self.df[
-            self.df['name'].isin(self.users)
-            & self.df['event'].isna()
-            & self.df['date'].isin(date_range)
-            ]
-
-        # 기준일 부터 대화 0회 인원
-        chat_zero_users = self.users[~np.isin(
-            self.users,
-            result_df['name'].unique())
-        ]
-        chat_zero_users = self.df[
-            self.df['name'].isin(chat_zero_users)
-        ].groupby('name')[['date']].max().reset_index()
-        chat_zero_users['count'] = 0
-        chat_zero_users = chat_zero_users.rename(
-            columns={'name': '유저', 'count': '대화 빈도', 'date': '마지막 대화'}
-        )
-
-        # 기준일 부터 대화 1회 이상 인원
-        result_df = result_df.groupby(['name'])[['date']].agg(
-            ['count', 'max']
-        ).date.reset_index()
-        result_df = result_df.rename(
-            columns={'name': '유저', 'count': '대화 빈도', 'max': '마지막 대화'}
-        )
-
-        # 병합 및 결과 산출
-        result_df = pd.concat([result_df, chat_zero_users])
-        result_df = result_df[result_df['대화 빈도'] <= num]
-        result_df = result_df.sort_values(
-            by='대화 빈도',
-            ignore_index=True,
-            ascending=False
+        min_date = self.__to_date(min_date)
+        max_date = self.__to_date(max_date)
+
+        # 병합 및 결과 산출 (정렬 전 결과만 캐시)
+        def compute() -> pl.DataFrame:
+            result_df = self.__chat_count(min_date, max_date).filter(
+                pl.col('대화 빈도') <= num
+            )
+
+            # 유저 입장 기록이 있는 인원만
+            death_user_in = self.__user_last.lazy().filter(
+                pl.col('입장')
+            ).select(pl.col('user_id'))
+            return result_df.join(
+                death_user_in, on='user_id', how='semi'
+            ).drop('user_id').collect()
+
+        result_df = self.__query(
+            ('death_note', min_date, max_date, num),
+            compute,
         )
 
-        # 유저 입장
-        death_user_in = self.df[
-            self.df['name'].isin(result_df['유저'])
-            & self.df['event'].isin(['들어왔습니다.'])
-            ]
-        death_user_in = death_user_in.drop_duplicates(
-            subset='name',
-            keep='last'
-        )
-        death_user_in = death_user_in[['name', 'date']]
-        death_user_in = death_user_in.rename(
-            columns={'name': '유저', 'date': '입장'}
-        )
-        result_df = result_df.merge(death_user_in)
-        result_df = result_df[['유저', '대화 빈도', '마지막 대화']]
-
-        # 마지막 대화 기준 정렬
-        result_df = result_df.sort_values(
-            sort_key,
-            ignore_index=True,
-            ascending=ascending
+        # 정렬 (같은 값은 유저 이름 순)
+        result_df = result_df.sort(
+            [sort_key, '유저'],
+            descending=[not ascending, False],
+        ).with_columns(
+            self.__days_ago(self.save_point.date())
         )
-        result_df['마지막 대화'] = (
-                self.save_point
-                - result_df['마지막 대화']
-        ).dt.days.apply(lambda x: f'{x:2}일 전' if x else '오늘')
 
-        return result_df
+        return result_df.to_pandas()
 
     def rank(
             self,
@@ -210,53 +773,24 @@ class DataHandler:
             date_format: str,
             filter: str
     ):
-        min_date = pd.to_datetime(min_date, format=date_format)
-        max_date = pd.to_datetime(max_date, format=date_format)
-        date_range = pd.date_range(
-            start=min_date,
-            end=max_date,
-        )
+        min_date = self.__to_date(min_date)
+        max_date = self.__to_date(max_date)
         _, filter = filter.split(' ', maxsplit=1)
-        # Filter
-        result_df = self.df[
-            self.df['name'].isin(self.users)
-            & self.df['event'].isna()
-            & self.df['date'].isin(date_range)
-            ]
-
-        # 기준일 부터 대화 0회 인원
-        chat_zero_users = self.users[~np.isin(
-            self.users,
-            result_df['name'].unique())
-        ]
-        chat_zero_users = self.df[
-            self.df['name'].isin(chat_zero_users)
-        ].groupby('name')[['date']].max().reset_index()
-        chat_zero_users['count'] = 0
-        chat_zero_users = chat_zero_users.rename(
-            columns={'name': '유저', 'count': '대화 빈도', 'date': '마지막 대화'}
+        message_type = TYPE_FILTERS[filter]
+
+        # 대화 빈도 기준 정렬 (같은 값은 유저 이름 순)
+        result_df = self.__query(
+            ('rank', min_date, max_date, filter),
+            lambda: self.__chat_count(
+                min_date, max_date, message_type
+            ).sort(
+                ['대화 빈도', '유저'],
+                descending=[True, False],
+            ).head(20).drop('user_id').collect(),
+        ).with_columns(
+            self.__days_ago(max_date)
         )
-        # 기준일 부터 대화 1회 이상 인원
-        result_df = result_df.groupby(['name'])[['date']].agg(
-            ['count', 'max']).date.reset_index()
-        result_df = result_df.rename(
-            columns={'name': '유저', 'count': '대화 빈도', 'max': '마지막 대화'})
-
-        # 병합 및 결과 산출
-        result_df = pd.concat([result_df, chat_zero_users])
-        result_df = result_df.sort_values(by='대화 빈도', ignore_index=True,
-                                          ascending=False)
-
-        # print(result_df[result_df['유저'] == '타이거(화성/⁸⁵/갤S²⁰)'])
-
-        # 마지막 대화 기준 정렬
-        result_df = result_df.sort_values('대화 빈도', ignore_index=True,
-                                          ascending=False)
-
-        result_df['마지막 대화'] = (
-                    max_date - result_df['마지막 대화']).dt.days.apply(
-            lambda x: f'{x:2}일 전' if x else '오늘')
 
-        result_df = result_df.head(20)
+        result_df = result_df.to_pandas()
         result_df.index += 1
         return result_df
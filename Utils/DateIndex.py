@@ -0,0 +1,41 @@
+"""DateIndex Module"""
+
+from datetime import date
+from typing import Optional, Tuple
+
+import polars as pl
+
+
+def date_bounds(
+        dates: pl.Series,
+        min_date: Optional[date] = None,
+        max_date: Optional[date] = None,
+) -> Tuple[int, int]:
+    '''
+    정렬된 날짜 컬럼을 이진 탐색하여 [min_date, max_date] 구간의 행 범위
+
+    대화, 일별 집계처럼 날짜 순으로 정렬된 표는 기간을 두 번의
+    search_sorted와 복사 없는 slice로 잘라낼 수 있습니다.
+
+    Parameters
+    ----------
+    dates: pl.Series
+        오름차순으로 정렬된 date 컬럼
+    min_date: Optional, date
+        None이면 처음부터
+    max_date: Optional, date
+        None이면 끝까지
+
+    Returns
+    -------
+    start: int
+    end: int
+        frame.slice(start, end - start)로 구간을 잘라냄 (start <= end)
+    '''
+    start = 0 if min_date is None else dates.search_sorted(
+        pl.Series([min_date]), side='left'
+    )[0]
+    end = len(dates) if max_date is None else dates.search_sorted(
+        pl.Series([max_date]), side='right'
+    )[0]
+    return start, max(end, start)
@@ -0,0 +1,74 @@
+"""HandlerCache Module"""
+
+import threading
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Callable, Hashable
+
+if TYPE_CHECKING:
+    from Utils.DataControl import DataHandler
+
+
+class HandlerCache:
+    '''
+    세션과 재실행이 함께 쓰는 DataHandler 메모리 캐시
+
+    업로드 내용의 해시와 파싱 설정을 키로 사용하며, 보관한 DataHandler의
+    전체 크기(처음 쓸 때 만드는 색인, 집계와 조회 캐시 포함)가 max_bytes를
+    넘으면 가장 오래 사용하지 않은 항목부터 지웁니다. 집계는 불러온 뒤에도
+    늘어나므로 조회할 때마다 크기를 다시 잽니다. 방금 쓴 항목은 혼자
+    max_bytes를 넘더라도 남겨 둡니다.
+
+    Parameters
+    ----------
+    max_bytes : int, default 1G
+        보관할 DataHandler의 최대 크기 (DataHandler.estimated_size)
+    '''
+
+    def __init__(self, max_bytes: int = 1 << 30):
+        self.max_bytes = max_bytes
+        self.__handlers = OrderedDict()
+        self.__lock = threading.Lock()
+
+    def get(
+            self,
+            key: Hashable,
+            load: Callable[[], 'DataHandler'],
+    ) -> 'DataHandler':
+        '''
+
+        Parameters
+        ----------
+        key: Hashable
+            (업로드 해시, 누적 저장, 닉네임 변경)
+        load: Callable
+            캐시에 없을 때 DataHandler를 만드는 함수
+
+        Returns
+        -------
+        DataHandler
+        '''
+        with self.__lock:
+            if key in self.__handlers:
+                self.__handlers.move_to_end(key)
+                self.__evict()
+                return self.__handlers[key]
+
+        # 파싱은 잠금 밖에서 (다른 업로드를 기다리게 하지 않음)
+        handler = load()
+        with self.__lock:
+            self.__handlers[key] = handler
+            self.__evict()
+        return handler
+
+    def __evict(self) -> None:
+        '''
+        max_bytes를 넘는 동안 가장 오래 사용하지 않은 항목부터 지움
+        '''
+        sizes = {
+            key: handler.estimated_size()
+            for key, handler in self.__handlers.items()
+        }
+        total = sum(sizes.values())
+        while total > self.max_bytes and len(self.__handlers) > 1:
+            key, _ = self.__handlers.popitem(last=False)
+            total -= sizes[key]
@@ -0,0 +1,71 @@
+"""HourlyCube Module"""
+
+from datetime import date
+from typing import Optional
+
+import numpy as np
+import polars as pl
+
+from Utils.DateIndex import date_bounds
+
+WEEKDAYS = ['월', '화', '수', '목', '금', '토', '일']
+
+
+class HourlyCube:
+    '''
+    (날짜, 요일, 시간, 유저)별 대화 수
+
+    all_date에서 한 번의 group_by로 만들고 날짜순으로 정렬해 두어,
+    요일 × 시간 히트맵은 기간을 이진 탐색으로 자른 뒤 168칸에 더하기만 합니다.
+
+    Parameters
+    ----------
+    df : pl.DataFrame
+        대화
+    '''
+
+    def __init__(self, df: pl.DataFrame):
+        self.counts = df.lazy().filter(pl.col('event').is_null()).group_by(
+            pl.col('date'),
+            pl.col('all_date').dt.weekday().alias('weekday'),
+            pl.col('all_date').dt.hour().alias('hour'),
+            pl.col('user_id'),
+        ).len().rename({'len': 'count'}).sort('date').collect()
+
+    def heatmap(
+            self,
+            min_date: Optional[date] = None,
+            max_date: Optional[date] = None,
+            user_id: Optional[int] = None,
+    ) -> pl.DataFrame:
+        '''
+        요일 × 시간 대화 수
+
+        Parameters
+        ----------
+        min_date: Optional, date
+        max_date: Optional, date
+        user_id: Optional, int
+            유저 (None이면 전체)
+
+        Returns
+        -------
+        pl.DataFrame
+            요일, 시간, 대화 수 (168행, 월요일 0시부터)
+        '''
+        start, end = date_bounds(self.counts.get_column('date'), min_date, max_date)
+        frame = self.counts.slice(start, end - start)
+        if user_id is not None:
+            frame = frame.filter(pl.col('user_id') == user_id)
+
+        cells = np.bincount(
+            (frame.get_column('weekday').to_numpy().astype(np.int64) - 1) * 24
+            + frame.get_column('hour').to_numpy(),
+            weights=frame.get_column('count').to_numpy(),
+            minlength=7 * 24,
+        )
+        return pl.DataFrame({
+            '요일': pl.Series(np.repeat(WEEKDAYS, 24)),
+            '시간': pl.Series(np.tile(np.arange(24), 7), dtype=pl.Int8),
+            '대화 수': pl.Series(cells, dtype=pl.UInt32),
+        })
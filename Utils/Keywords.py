@@ -0,0 +1,156 @@
+"""Keywords Module"""
+
+from datetime import date
+from typing import Optional
+
+import numpy as np
+import polars as pl
+
+from Utils.DateIndex import date_bounds
+
+# 단어를 뽑을 대화 유형 (사진, 이모티콘 등 내용 대신 들어가는 문구 제외)
+WORD_TYPES = ['text', 'link']
+# 세 글자 이상 단어 끝의 조사는 떼어냄 (형태소 분석 없이 대략적으로)
+JOSA_PATTERN = (
+    r'(으로|에서|에게|한테|이랑|까지|부터|처럼|보다'
+    r'|은|는|이|가|을|를|에|의|도|로|와|과|랑)$'
+)
+WORD_PATTERN = r'[0-9a-z가-힣]+'
+
+
+class Keywords:
+    '''
+    기간별, 유저별 TF-IDF 키워드
+
+    불러올 때 한 번 대화를 단어로 나누어 (유저, 날짜, 단어) 빈도를 만들고,
+    유저 × 단어, 날짜 × 단어 희소 행렬(COO)과 단어별 문서 수를 함께 둡니다.
+    키워드 조회는 날짜순으로 정렬된 빈도에서 기간을 잘라 단어별로 합산할 뿐
+    원문을 다시 읽지 않습니다.
+
+    Parameters
+    ----------
+    df : pl.DataFrame
+        시간순으로 정렬된 대화
+    '''
+
+    def __init__(self, df: pl.DataFrame):
+        word = pl.col('word')
+        words = df.lazy().filter(
+            pl.col('type').is_in(WORD_TYPES)
+        ).select(
+            pl.col('user_id'),
+            pl.col('date'),
+            pl.col('chat').str.to_lowercase().str.extract_all(
+                WORD_PATTERN
+            ).alias('word'),
+        ).explode('word').with_columns(
+            pl.when(word.str.len_chars() >= 3)
+            .then(word.str.replace(JOSA_PATTERN, ''))
+            .otherwise(word)
+        ).filter(
+            (word.str.len_chars() >= 2) & ~word.str.contains('^[0-9]+$')
+        ).with_columns(
+            word.cast(pl.Categorical)
+        ).group_by(['user_id', 'date', 'word']).len().sort('date').collect()
+
+        self.vocabulary = words.get_column('word').cat.get_categories()
+        # (유저, 날짜, 단어 번호, 빈도), 날짜순
+        self.counts = words.select(
+            pl.col('user_id'),
+            pl.col('date'),
+            pl.col('word').to_physical().alias('term'),
+            pl.col('len').alias('count'),
+        )
+
+        # 유저 × 단어, 날짜 × 단어 희소 행렬
+        self.user_terms = self.counts.group_by(['user_id', 'term']).agg(
+            pl.col('count').sum()
+        )
+        self.day_terms = self.counts.group_by(['date', 'term']).agg(
+            pl.col('count').sum()
+        ).sort('date')
+
+        # 단어가 나온 유저 수, 날짜 수 (IDF)
+        size = len(self.vocabulary)
+        self.user_idf = self.__idf(
+            self.user_terms.get_column('term').to_numpy(),
+            self.user_terms.get_column('user_id').n_unique(),
+            size,
+        )
+        self.day_idf = self.__idf(
+            self.day_terms.get_column('term').to_numpy(),
+            self.day_terms.get_column('date').n_unique(),
+            size,
+        )
+
+    @staticmethod
+    def __idf(terms: np.ndarray, documents: int, size: int) -> np.ndarray:
+        frequency = np.bincount(terms, minlength=size)
+        return np.log((1 + documents) / (1 + frequency)) + 1
+
+    @staticmethod
+    def __date_range(
+            frame: pl.DataFrame,
+            min_date: Optional[date],
+            max_date: Optional[date],
+    ) -> pl.DataFrame:
+        start, end = date_bounds(frame.get_column('date'), min_date, max_date)
+        return frame.slice(start, end - start)
+
+    def top(
+            self,
+            k: int = 20,
+            min_date: Optional[date] = None,
+            max_date: Optional[date] = None,
+            user_id: Optional[int] = None,
+    ) -> pl.DataFrame:
+        '''
+        기간(또는 기간 내 한 유저)의 TF-IDF 상위 키워드
+
+        유저를 고르면 다른 유저와 구분되는 단어(유저 기준 IDF)를,
+        고르지 않으면 다른 날과 구분되는 단어(날짜 기준 IDF)를 찾습니다.
+
+        Parameters
+        ----------
+        k: int, default 20
+        min_date: Optional, date
+        max_date: Optional, date
+        user_id: Optional, int
+            유저 (None이면 전체)
+
+        Returns
+        -------
+        pl.DataFrame
+            키워드, 빈도, 점수
+        '''
+        if user_id is None:
+            frame = self.__date_range(self.day_terms, min_date, max_date)
+            idf = self.day_idf
+        else:
+            frame = self.__date_range(self.counts, min_date, max_date).filter(
+                pl.col('user_id') == user_id
+            )
+            idf = self.user_idf
+
+        size = len(self.vocabulary)
+        tf = np.bincount(
+            frame.get_column('term').to_numpy(),
+            weights=frame.get_column('count').to_numpy(),
+            minlength=size,
+        )
+        # 자주 쓴 단어가 점수를 독차지하지 않도록 로그 빈도 사용
+        score = np.zeros(size)
+        used = tf > 0
+        score[used] = (1 + np.log(tf[used])) * idf[used]
+
+        k = min(k, int(used.sum()))
+        if not k:
+            top = np.zeros(0, dtype=np.int64)
+        else:
+            top = np.argpartition(-score, k - 1)[:k]
+            top = top[np.lexsort((top, -score[top]))]
+        return pl.DataFrame({
+            '키워드': self.vocabulary.gather(top),
+            '빈도': pl.Series(tf[top], dtype=pl.UInt32),
+            '점수': pl.Series(score[top].round(3), dtype=pl.Float64),
+        })
@@ -0,0 +1,234 @@
+"""MembershipTimeline Module"""
+
+from datetime import date, datetime, time, timedelta
+from typing import List, Optional, Union
+
+import numpy as np
+import polars as pl
+
+from Utils.Text2DataFrame.KakaoTalk2DataFrame_Polars import IO_EVENTS
+
+# 아직 나가지 않은 구간의 끝
+OPEN_END = datetime.max
+
+
+class MembershipTimeline:
+    '''
+    입장/퇴장/내보내기 이벤트로 만든 유저별 참여 구간
+
+    유저마다 시간순 이벤트에서 상태가 바뀌는 지점만 남겨 [입장, 퇴장) 구간을
+    만듭니다 (intervals: user_id, start, end, joined). 첫 이벤트가 퇴장이거나
+    입퇴장 기록 없이 대화만 있는 유저는 대화 기록 시작 전부터 있던 것으로
+    봅니다.
+    구간 시작/끝을 +1/-1 변화로 정렬해 누적합을 두어, 특정 시점 인원은
+    이진 탐색 한 번으로, 특정 시점 유저 목록은 시작 시각으로 정렬된 구간에서
+    찾습니다.
+
+    Parameters
+    ----------
+    df : pl.DataFrame
+        시간순으로 정렬된 대화
+    identities : pl.DataFrame
+        user_id, name (대표 이름)
+    not_user : List[str], default None
+        유저가 아닌 이름 (채팅방 관리자 등)
+    end : datetime, optional
+        기간별 인원을 계산할 마지막 시점 (없으면 마지막 대화 시각)
+    '''
+
+    def __init__(
+            self,
+            df: pl.DataFrame,
+            identities: pl.DataFrame,
+            not_user: List[str] = None,
+            end: Optional[datetime] = None,
+    ):
+        self.start = df.get_column('all_date').min() or datetime.min
+        self.end = end or df.get_column('all_date').max() or self.start
+        self.identities = identities
+        joined = pl.col('joined')
+        df = df.join(
+            identities.filter(pl.col('name').is_in(not_user or [])),
+            on='user_id',
+            how='anti',
+        )
+
+        changes = df.lazy().filter(pl.col('event').is_in(IO_EVENTS)).select(
+            pl.col('user_id'),
+            pl.col('all_date'),
+            (pl.col('event') == '들어왔습니다.').alias('joined'),
+        ).filter(
+            # 같은 상태가 이어지는 이벤트는 첫 번째만
+            joined.ne_missing(joined.shift(1).over('user_id'))
+        )
+        # 입장 → 다음 퇴장, 또는 기록 시작 전부터 → 첫 퇴장
+        opened = changes.with_columns(
+            pl.col('all_date').shift(-1).over('user_id').alias('next'),
+            pl.int_range(0, pl.len()).over('user_id').alias('order'),
+        )
+        intervals = pl.concat([
+            opened.filter(joined).select(
+                pl.col('user_id'),
+                pl.col('all_date').alias('start'),
+                pl.col('next').alias('end'),
+                pl.lit(True).alias('joined'),
+            ),
+            opened.filter(~joined & (pl.col('order') == 0)).select(
+                pl.col('user_id'),
+                pl.lit(self.start).alias('start'),
+                pl.col('all_date').alias('end'),
+                pl.lit(False).alias('joined'),
+            ),
+            # 입퇴장 기록이 없는 유저
+            df.lazy().select(
+                pl.col('user_id').unique()
+            ).join(changes, on='user_id', how='anti').select(
+                pl.col('user_id'),
+                pl.lit(self.start).alias('start'),
+                pl.lit(None, dtype=pl.Datetime('us')).alias('end'),
+                pl.lit(False).alias('joined'),
+            ),
+        ]).with_columns(
+            pl.col('end').fill_null(OPEN_END)
+        ).sort('start').collect()
+        self.intervals = intervals
+
+        # 인원 변화 (+1 입장, -1 퇴장) 누적합
+        starts = intervals.get_column('start').to_numpy()
+        ends = intervals.get_column('end').to_numpy()
+        times = np.concatenate([starts, ends])
+        steps = np.concatenate([
+            np.ones(len(starts), dtype=np.int64),
+            -np.ones(len(ends), dtype=np.int64),
+        ])
+        order = np.argsort(times, kind='stable')
+        self.__times = times[order]
+        self.__counts = np.cumsum(steps[order])
+
+    @staticmethod
+    def __point(at: Union[date, datetime]) -> datetime:
+        '''
+        날짜는 그날 끝 시점으로 봄
+        '''
+        if not isinstance(at, datetime):
+            at = datetime.combine(at, time()) + timedelta(days=1)
+            at -= timedelta(microseconds=1)
+        return at
+
+    def count_at(self, at: Union[date, datetime]) -> int:
+        '''
+        특정 시점 인원
+
+        Parameters
+        ----------
+        at: date, datetime
+            날짜면 그날 끝 시점
+
+        Returns
+        -------
+        int
+        '''
+        point = np.datetime64(self.__point(at), 'us')
+        return int(self.__count_at(np.array([point]))[0])
+
+    def __count_at(self, points: np.ndarray) -> np.ndarray:
+        i = np.searchsorted(self.__times, points, side='right')
+        counts = np.concatenate([[0], self.__counts])
+        return counts[i]
+
+    def counts(self, every: str = '1d') -> pl.DataFrame:
+        '''
+        기간 단위별 인원 (구간 끝 시점)
+
+        Parameters
+        ----------
+        every: str, default '1d'
+            '1d', '1w', '1mo' 등 polars 기간
+
+        Returns
+        -------
+        pl.DataFrame
+            date, 인원
+        '''
+        # 기간 단위의 시작부터 세어야 마지막 시점이 든 구간까지 포함됨
+        first = pl.Series([self.start.date()]).dt.truncate(every)[0]
+        last = max(self.end, self.__last(), self.start).date()
+        dates = pl.date_range(first, last, every, eager=True)
+        ends = dates.dt.offset_by(every).cast(pl.Datetime('us')).to_numpy()
+        return pl.DataFrame({
+            'date': dates,
+            '인원': self.__count_at(ends - np.timedelta64(1, 'us')),
+        })
+
+    def __last(self) -> datetime:
+        '''
+        마지막 입장/퇴장 시각 (없으면 기록 시작)
+        '''
+        times = self.__times[self.__times < np.datetime64(OPEN_END, 'us')]
+        return times.max().astype(datetime) if len(times) else self.start
+
+    def members_at(self, at: Union[date, datetime]) -> pl.Series:
+        '''
+        특정 시점에 채팅방에 있던 유저
+
+        Parameters
+        ----------
+        at: date, datetime
+            날짜면 그날 끝 시점
+
+        Returns
+        -------
+        pl.Series
+        '''
+        point = self.__point(at)
+        starts = self.intervals.get_column('start')
+        i = starts.search_sorted(pl.Series([point]), side='right')[0]
+        return self.intervals.head(i).filter(
+            pl.col('end') > point
+        ).select('user_id').unique().join(
+            self.identities, on='user_id'
+        ).get_column('name').sort()
+
+    def monthly(self) -> pl.DataFrame:
+        '''
+        월별 유입, 이탈, 월말 인원, 이탈률
+
+        Returns
+        -------
+        pl.DataFrame
+            월, 유입, 이탈, 인원, 이탈률 (이탈 / 월초 인원)
+        '''
+        if not len(self.intervals):
+            return pl.DataFrame(schema={
+                '월': pl.Date,
+                '유입': pl.UInt32,
+                '이탈': pl.UInt32,
+                '인원': pl.Int64,
+                '이탈률': pl.Float64,
+            })
+        month = pl.col('at').dt.truncate('1mo').cast(pl.Date).alias('월')
+        flows = pl.concat([
+            self.intervals.lazy().filter(
+                pl.col('joined')
+            ).select(pl.col('start').alias('at'), pl.lit(1).alias('join')),
+            self.intervals.lazy().filter(
+                pl.col('end') < OPEN_END
+            ).select(pl.col('end').alias('at'), pl.lit(0).alias('join')),
+        ]).group_by(month).agg(
+            (pl.col('join') == 1).sum().alias('유입'),
+            (pl.col('join') == 0).sum().alias('이탈'),
+        )
+
+        result = self.counts('1mo').rename({'date': '월'}).lazy().join(
+            flows, on='월', how='left'
+        ).with_columns(
+            pl.col('유입', '이탈').fill_null(0)
+        ).select('월', '유입', '이탈', '인원').collect()
+
+        previous = pl.col('인원') - pl.col('유입') + pl.col('이탈')
+        return result.with_columns(
+            pl.when(previous > 0)
+            .then(pl.col('이탈') / previous)
+            .otherwise(0.0)
+            .alias('이탈률')
+        )
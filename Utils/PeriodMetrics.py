@@ -0,0 +1,116 @@
+"""PeriodMetrics Module"""
+
+from datetime import date
+from typing import Dict, Tuple
+
+import polars as pl
+
+from Utils.Text2DataFrame.KakaoTalk2DataFrame_Polars import OUT_EVENTS
+
+PERIODS = {
+    'day': '1d',
+    'week': '1w',
+    'month': '1mo',
+}
+
+
+class PeriodMetrics:
+    '''
+    기간별 주요 지표 (대화, 참여자, 유입, 이탈)
+
+    기간 단위마다 한 번의 group_by로 모든 지표의 시계열을 만들어 두고,
+    전일/전주/전월 대비는 시계열에서 두 구간만 꺼내 계산합니다.
+
+    Parameters
+    ----------
+    df : pl.DataFrame
+        대화
+    '''
+
+    def __init__(self, df: pl.DataFrame):
+        self.__df = df
+        self.__series = {}
+
+    def series(self, period: str = 'day') -> pl.DataFrame:
+        '''
+        기간 단위별 지표 시계열 (대화가 없는 구간은 0)
+
+        Parameters
+        ----------
+        period: str, default 'day'
+            'day', 'week', 'month'
+
+        Returns
+        -------
+        pl.DataFrame
+            date, chats, speakers, joins, leaves
+        '''
+        if period not in self.__series:
+            is_chat = pl.col('chat').is_not_null()
+            series = self.__df.lazy().group_by(
+                pl.col('date').dt.truncate(PERIODS[period])
+            ).agg(
+                is_chat.sum().alias('chats'),
+                pl.col('user_id').filter(is_chat).n_unique().alias('speakers'),
+                (pl.col('event') == '들어왔습니다.').sum().alias('joins'),
+                pl.col('event').is_in(OUT_EVENTS).sum().alias('leaves'),
+            ).sort('date').collect()
+            self.__series[period] = series.upsample(
+                'date', every=PERIODS[period]
+            ).fill_null(0)
+        return self.__series[period]
+
+    def compare(
+            self,
+            base: date,
+            period: str = 'day',
+    ) -> Dict[str, Tuple[int, str]]:
+        '''
+        기준일이 속한 구간과 직전 구간 비교
+
+        Parameters
+        ----------
+        base: date
+            기준일
+        period: str, default 'day'
+            'day', 'week', 'month'
+
+        Returns
+        -------
+        Dict[str, Tuple[int, str]]
+            지표별 (현재 구간 값, 증감률)
+        '''
+        every = PERIODS[period]
+        current = pl.Series([base]).dt.truncate(every)
+        previous = current.dt.offset_by(f'-{every}')
+
+        series = self.series(period)
+        sizes = {
+            row['date']: row
+            for row in series.filter(
+                pl.col('date').is_in(pl.concat([previous, current]))
+            ).iter_rows(named=True)
+        }
+        now = sizes.get(current[0], {})
+        before = sizes.get(previous[0], {})
+
+        return {
+            metric: (
+                now.get(metric, 0),
+                self.ratio(now.get(metric, 0), before.get(metric, 0)),
+            )
+            for metric in series.columns[1:]
+        }
+
+    @staticmethod
+    def ratio(size: int, previous_size: int) -> str:
+        '''
+        증감률 문자열 (직전 값이 0이면 차이를 그대로 사용)
+        '''
+        if not previous_size:
+            result = (size - previous_size)
+        elif size == previous_size:
+            result = 0
+        else:
+            result = (size - previous_size) / previous_size
+        return f'{result:.2%}'
@@ -0,0 +1,305 @@
+"""RoomStore Module"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from datetime import datetime
+from typing import Iterable, List, Optional, Tuple, Union
+
+import polars as pl
+
+from Utils.SearchIndex import SearchIndex
+from Utils.Text2DataFrame import KakaoTalk2DataFrame
+from Utils.Text2DataFrame import __version__ as parser_version
+
+DEFAULT_ROOT = os.path.join(
+    os.path.expanduser('~'), '.cache', 'kakaotalk-tok', 'rooms'
+)
+
+
+class RoomStore:
+    '''
+    같은 채팅방을 다시 내보낸 파일을 누적 저장하는 저장소
+
+    채팅방은 타이틀로 구분하며, 저장된 마지막 대화 시각 이후의 뒷부분만
+    파싱하여 Parquet 조각으로 덧붙이고 유저별 입장/퇴장 상태를 갱신합니다.
+    검색 색인은 조각 수별로 저장하며, 조각을 덧붙이면 다시 만듭니다.
+
+    Parameters
+    ----------
+    root : str, default ~/.cache/kakaotalk-tok/rooms
+        저장소 폴더
+    '''
+
+    def __init__(self, root: str = DEFAULT_ROOT):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def path(self, title: str) -> str:
+        '''
+
+        Parameters
+        ----------
+        title: str
+
+        Returns
+        -------
+        path: str
+            채팅방 폴더
+        '''
+        key = hashlib.sha256(title.encode('utf-8')).hexdigest()
+        return os.path.join(self.root, key)
+
+    def index_key(self, title: str) -> str:
+        '''
+        검색 색인 키 (채팅방 폴더와 저장된 조각 수)
+
+        Parameters
+        ----------
+        title: str
+
+        Returns
+        -------
+        key: str
+        '''
+        path = self.path(title)
+        meta = self.__read_meta(path)
+        parts = 0 if meta is None else meta['parts']
+        return f'{os.path.basename(path)}-{parts:05d}'
+
+    def get_index(self, key: str) -> Optional[SearchIndex]:
+        '''
+        채팅방 폴더에 저장된 검색 색인
+
+        Parameters
+        ----------
+        key: str
+            index_key
+
+        Returns
+        -------
+        index: Optional[SearchIndex]
+            저장된 색인이 없거나 그 뒤로 조각을 덧붙였으면 None
+        '''
+        return SearchIndex.load(self.__index_path(key))
+
+    def put_index(self, key: str, index: SearchIndex) -> None:
+        '''
+
+        Parameters
+        ----------
+        key: str
+            index_key
+        index: SearchIndex
+        '''
+        path = self.__index_path(key)
+        if not os.path.isdir(os.path.dirname(path)):
+            return
+        index.save(path)
+
+    def __index_path(self, key: str) -> str:
+        room, parts = key.rsplit('-', 1)
+        return os.path.join(self.root, room, f'search-{parts}.npz')
+
+    def ingest(
+            self,
+            buffer: Union[bytes, memoryview],
+            not_user: List[str],
+            bot_used: bool,
+            aliases: Optional[Iterable[Tuple[str, str]]] = None,
+    ) -> KakaoTalk2DataFrame:
+        '''
+        새로 내보낸 파일의 새 대화만 파싱하여 저장소에 덧붙임
+
+        Parameters
+        ----------
+        buffer: bytes, memoryview
+        not_user: List[str]
+        bot_used: bool
+        aliases: Optional, Iterable[Tuple[str, str]]
+            같은 사람의 (이전 이름, 이후 이름)
+
+        Returns
+        -------
+        chat: KakaoTalk2DataFrame
+            저장된 전체 대화
+        '''
+        path = self.path(KakaoTalk2DataFrame.read_title(buffer))
+        meta = self.__read_meta(path)
+        since = None
+        if meta is not None:
+            since = datetime.fromisoformat(meta['last'])
+
+        chat = KakaoTalk2DataFrame(
+            path=buffer,
+            bot_used=bot_used,
+            not_user=not_user,
+            since=since,
+        )
+        tail = self.__decode(chat.data)
+        if meta is not None:
+            # 마지막 시각(분 단위)에 이미 저장된 대화는 건너뜀
+            stored = pl.scan_parquet(self.__parts(path, meta)).filter(
+                pl.col('all_date') == since
+            ).collect()
+            last = tail.get_column('all_date').max()
+            if tail.head(len(stored)).equals(stored):
+                tail = tail.slice(len(stored))
+            elif last is None or last <= since:
+                # 저장된 대화보다 먼저 끝나는 내보내기 (전날 파일, 기록이 짧은
+                # 기기 등)는 덧붙일 대화가 없음
+                tail = tail.head(0)
+            else:
+                # 이어지는 내보내기가 아니면 처음부터 다시 저장
+                meta = since = None
+                chat = KakaoTalk2DataFrame(
+                    path=buffer,
+                    bot_used=bot_used,
+                    not_user=not_user,
+                )
+                tail = self.__decode(chat.data)
+
+        if meta is None:
+            membership = self.__decode(chat.membership())
+            meta = self.__rebuild(path, tail, membership, since)
+        else:
+            membership = pl.read_parquet(os.path.join(path, 'membership.parquet'))
+            if len(tail):
+                chat.data = tail
+                membership = pl.concat([
+                    membership,
+                    self.__decode(chat.membership()),
+                ])
+                membership = membership.group_by(
+                    'name',
+                    maintain_order=True,
+                ).agg(pl.col('event', 'at').drop_nulls().last())
+                meta = self.__append(path, meta, tail, membership)
+
+        chat.data = KakaoTalk2DataFrame.encode(
+            pl.read_parquet(self.__parts(path, meta))
+        )
+        # user_id는 조각이 아닌 전체 대화에서 다시 매김
+        chat.identify(aliases)
+        chat.get_users(not_user=not_user, membership=membership)
+        return chat
+
+    @staticmethod
+    def __decode(data: pl.DataFrame) -> pl.DataFrame:
+        '''
+        조각마다 사전이 달라지지 않도록 문자열로 저장 (user_id 제외)
+        '''
+        return data.select(pl.exclude('user_id')).with_columns(
+            pl.col('name', 'event').cast(pl.Utf8)
+        )
+
+    def __rebuild(
+            self,
+            path: str,
+            data: pl.DataFrame,
+            membership: pl.DataFrame,
+            since: Optional[datetime],
+    ) -> dict:
+        '''
+        채팅방 폴더를 전체 대화 한 조각으로 새로 만듦
+
+        다른 프로세스나 중간에 멈춘 저장이 반쯤 쓴 폴더를 보지 않도록 임시 폴더에
+        모두 쓴 뒤 기존 폴더와 바꿉니다.
+
+        Returns
+        -------
+        meta: dict
+        '''
+        last = data.get_column('all_date').max() or since or datetime.min
+        meta = {'version': parser_version, 'parts': 1, 'last': last.isoformat()}
+        tmp = tempfile.mkdtemp(prefix='.tmp-', dir=self.root)
+        old = None
+        try:
+            data.write_parquet(self.__part(tmp, 0))
+            membership.write_parquet(os.path.join(tmp, 'membership.parquet'))
+            self.__write_meta(tmp, meta)
+            if os.path.isdir(path):
+                old = tempfile.mkdtemp(prefix='.old-', dir=self.root)
+                os.replace(path, os.path.join(old, 'room'))
+            os.replace(tmp, path)
+        except OSError:
+            shutil.rmtree(tmp, ignore_errors=True)
+            raise
+        finally:
+            if old is not None:
+                shutil.rmtree(old, ignore_errors=True)
+        return meta
+
+    def __append(
+            self,
+            path: str,
+            meta: dict,
+            tail: pl.DataFrame,
+            membership: pl.DataFrame,
+    ) -> dict:
+        '''
+        새 대화를 조각으로 덧붙임
+
+        조각과 입장/퇴장 상태를 먼저 쓰고 meta.json을 마지막에 바꾸므로, 중간에
+        멈추면 meta.json에 없는 조각은 읽지 않고 다음에 덮어씁니다.
+
+        Returns
+        -------
+        meta: dict
+        '''
+        parts = meta['parts']
+        self.__write_parquet(tail, self.__part(path, parts))
+        self.__write_parquet(
+            membership, os.path.join(path, 'membership.parquet')
+        )
+        # 이전 조각까지의 검색 색인은 더 쓰지 않음
+        for name in os.listdir(path):
+            if name.startswith('search-'):
+                os.remove(os.path.join(path, name))
+        meta = {
+            'version': parser_version,
+            'parts': parts + 1,
+            'last': tail.get_column('all_date').max().isoformat(),
+        }
+        self.__write_meta(path, meta)
+        return meta
+
+    @staticmethod
+    def __write_parquet(data: pl.DataFrame, path: str) -> None:
+        tmp = path + '.tmp'
+        data.write_parquet(tmp)
+        os.replace(tmp, path)
+
+    @classmethod
+    def __parts(cls, path: str, meta: dict) -> List[str]:
+        '''
+        meta.json에 기록된 조각 (기록 전에 멈춘 조각은 제외)
+        '''
+        return [cls.__part(path, i) for i in range(meta['parts'])]
+
+    @staticmethod
+    def __part(path: str, index: int) -> str:
+        return os.path.join(path, f'part-{index:05d}.parquet')
+
+    @staticmethod
+    def __read_meta(path: str) -> Optional[dict]:
+        '''
+        저장된 메타 정보 (없거나 파서 버전이 다르면 None)
+        '''
+        try:
+            with open(os.path.join(path, 'meta.json'), encoding='utf-8') as f:
+                meta = json.load(f)
+        except FileNotFoundError:
+            return None
+        if meta.get('version') != parser_version:
+            return None
+        return meta
+
+    @staticmethod
+    def __write_meta(path: str, meta: dict) -> None:
+        tmp = os.path.join(path, 'meta.json.tmp')
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        os.replace(tmp, os.path.join(path, 'meta.json'))
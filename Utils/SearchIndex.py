@@ -0,0 +1,202 @@
+"""SearchIndex Module"""
+
+import os
+import tempfile
+from typing import Optional
+
+import numpy as np
+import polars as pl
+
+# 문자 코드는 16비트로 자르므로 BMP 밖 문자(이모지 등)끼리는 같은 n-gram이 됩니다.
+# 후보가 조금 늘어날 뿐 최종 결과는 실제 포함 여부로 다시 확인합니다.
+CHAR_MASK = 0xFFFF
+
+
+class SearchIndex:
+    '''
+    대화 내용 검색용 문자 2-gram 역색인
+
+    형태소 분석 없이 한국어를 검색할 수 있도록 대화를 두 글자 단위로 잘라
+    2-gram별 대화 행 번호 목록을 만듭니다. 검색어의 모든 2-gram을 가진 행을
+    교집합으로 고른 뒤 실제 포함 여부만 다시 확인합니다. 영문은 대소문자를
+    구분하지 않습니다.
+
+    Parameters
+    ----------
+    keys : np.ndarray
+        정렬된 2-gram 코드 (uint32, 앞 글자 << 16 | 뒷 글자)
+    offsets : np.ndarray
+        2-gram별 rows 시작 위치 (len(keys) + 1)
+    rows : np.ndarray
+        2-gram별로 정렬된 대화 행 번호
+    '''
+
+    def __init__(
+            self,
+            keys: np.ndarray,
+            offsets: np.ndarray,
+            rows: np.ndarray,
+    ):
+        self.keys = keys
+        self.offsets = offsets
+        self.rows = rows
+
+    @staticmethod
+    def __codes(text: str) -> np.ndarray:
+        codes = np.frombuffer(text.encode('utf-32-le'), dtype=np.uint32)
+        return np.minimum(codes, CHAR_MASK)
+
+    @staticmethod
+    def __gram_keys(codes: np.ndarray) -> np.ndarray:
+        return codes[:-1] << 16 | codes[1:]
+
+    @classmethod
+    def build(cls, chat: pl.Series) -> 'SearchIndex':
+        '''
+
+        Parameters
+        ----------
+        chat : pl.Series
+            대화 내용 (행 번호가 곧 검색 결과)
+
+        Returns
+        -------
+        SearchIndex
+        '''
+        # 모든 대화를 '\0'으로 이어 붙여 한 번에 문자 코드 배열로 변환
+        chat = chat.fill_null('').str.replace_all('\x00', ' ', literal=True)
+        chat = chat.str.to_lowercase()
+        lengths = chat.str.len_chars().to_numpy().astype(np.int64)
+        codes = cls.__codes(chat.str.concat('\x00')[0] + '\x00')
+        rows = np.repeat(
+            np.arange(len(chat), dtype=np.uint64), lengths + 1
+        )[:-1]
+
+        # (2-gram, 행 번호)를 uint64 하나로 묶어 정렬 후 중복 제거
+        valid = (codes[:-1] != 0) & (codes[1:] != 0)
+        postings = cls.__gram_keys(codes)[valid].astype(np.uint64) << 32
+        postings |= rows[valid]
+        postings = pl.Series(postings, dtype=pl.UInt64).sort().to_numpy()
+        if len(postings):
+            postings = postings[
+                np.concatenate(([True], postings[1:] != postings[:-1]))
+            ]
+
+        grams = (postings >> 32).astype(np.uint32)
+        starts = np.flatnonzero(
+            np.concatenate(([True], grams[1:] != grams[:-1]))
+        ) if len(grams) else np.zeros(0, dtype=np.int64)
+        return cls(
+            keys=grams[starts],
+            offsets=np.append(starts, len(grams)).astype(np.int64),
+            rows=(postings & 0xFFFFFFFF).astype(np.uint32),
+        )
+
+    def save(self, path: str) -> None:
+        '''
+        npz 파일로 저장 (다른 프로세스가 반쯤 쓴 파일을 읽지 않도록 이동)
+
+        Parameters
+        ----------
+        path : str
+        '''
+        fd, tmp = tempfile.mkstemp(
+            prefix='.tmp-', suffix='.npz', dir=os.path.dirname(path) or '.'
+        )
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.savez(
+                    f,
+                    keys=self.keys,
+                    offsets=self.offsets,
+                    rows=self.rows,
+                )
+            os.replace(tmp, path)
+        except OSError:
+            os.remove(tmp)
+            raise
+
+    @classmethod
+    def load(cls, path: str) -> Optional['SearchIndex']:
+        '''
+
+        Parameters
+        ----------
+        path : str
+
+        Returns
+        -------
+        Optional[SearchIndex]
+            파일이 없으면 None
+        '''
+        if not os.path.isfile(path):
+            return None
+        with np.load(path) as f:
+            return cls(keys=f['keys'], offsets=f['offsets'], rows=f['rows'])
+
+    def __postings(self, key: int) -> np.ndarray:
+        i = np.searchsorted(self.keys, key)
+        if i == len(self.keys) or self.keys[i] != key:
+            return self.rows[:0]
+        return self.rows[self.offsets[i]:self.offsets[i + 1]]
+
+    def candidates(self, query: str) -> Optional[np.ndarray]:
+        '''
+        검색어의 모든 2-gram을 가진 행 번호 (오름차순)
+
+        Parameters
+        ----------
+        query : str
+
+        Returns
+        -------
+        Optional[np.ndarray]
+            검색어가 두 글자보다 짧으면 None
+        '''
+        if len(query) < 2:
+            return None
+        keys = np.unique(self.__gram_keys(self.__codes(query.lower())))
+        # 짧은 목록부터 교집합
+        postings = sorted(map(self.__postings, keys), key=len)
+        rows = postings[0]
+        for other in postings[1:]:
+            if not len(rows):
+                break
+            rows = np.intersect1d(rows, other, assume_unique=True)
+        return rows
+
+    def search(
+            self,
+            chat: pl.Series,
+            query: str,
+            start: int = 0,
+            end: Optional[int] = None,
+    ) -> np.ndarray:
+        '''
+        [start, end) 행 중 검색어를 포함한 행 번호
+
+        Parameters
+        ----------
+        chat : pl.Series
+            색인을 만든 대화 내용
+        query : str
+        start : int, default 0
+        end : Optional, int
+            None이면 끝까지
+
+        Returns
+        -------
+        np.ndarray
+        '''
+        end = len(chat) if end is None else end
+        rows = self.candidates(query)
+        if rows is None:
+            rows = np.arange(start, end, dtype=np.uint32)
+        else:
+            rows = rows[
+                np.searchsorted(rows, start):np.searchsorted(rows, end)
+            ]
+        found = chat.gather(rows).str.to_lowercase().str.contains(
+            query.lower(), literal=True
+        ).fill_null(False)
+        return rows[found.to_numpy()]
@@ -0,0 +1,170 @@
+"""SimilarUsers Module"""
+
+from typing import Tuple
+
+import numpy as np
+import polars as pl
+
+from Utils.HourlyCube import HourlyCube
+from Utils.Keywords import Keywords
+
+
+class SimilarUsers:
+    '''
+    대화 성향이 비슷한 유저 추천
+
+    유저마다 대화 내용(TF-IDF), 활동 시간대(24시간 분포), 활동량을 각각
+    단위 벡터로 만든 뒤 가중치의 제곱근을 곱해 이어 붙입니다. 두 유저 벡터의
+    내적이 곧 세 가지 코사인 유사도의 가중합이 됩니다.
+    대화 내용은 유저들이 가장 많이 쓴 max_terms 개 단어만 사용합니다.
+
+    Parameters
+    ----------
+    hourly : HourlyCube
+        유저별 시간대 대화 수
+    keywords : Keywords
+        유저 × 단어 행렬
+    users : pl.DataFrame
+        추천 대상 유저 (user_id, name)
+    max_terms : int, default 2048
+    weights : Tuple[float, float, float], default (0.6, 0.3, 0.1)
+        대화 내용, 활동 시간대, 활동량 가중치
+    '''
+
+    def __init__(
+            self,
+            hourly: HourlyCube,
+            keywords: Keywords,
+            users: pl.DataFrame,
+            max_terms: int = 2048,
+            weights: Tuple[float, float, float] = (0.6, 0.3, 0.1),
+    ):
+        self.users = users.get_column('name')
+        self.__rows = {name: row for row, name in enumerate(self.users)}
+        index = users.lazy().select(
+            pl.col('user_id'),
+            pl.int_range(0, pl.len(), dtype=pl.UInt32).alias('row'),
+        )
+
+        # 대화 내용: 유저 × 단어 TF-IDF (자주 쓰인 단어만)
+        terms = keywords.user_terms.lazy().join(index, on='user_id').collect()
+        term = terms.get_column('term').to_numpy()
+        kept = np.argsort(
+            -np.bincount(term, minlength=len(keywords.vocabulary)),
+            kind='stable',
+        )[:max_terms]
+        column = np.full(len(keywords.vocabulary), -1, dtype=np.int64)
+        column[kept] = np.arange(len(kept))
+        used = column[term] >= 0
+        content = np.zeros((len(users), len(kept)), dtype=np.float32)
+        content[
+            terms.get_column('row').to_numpy()[used], column[term][used]
+        ] = (
+            1 + np.log(terms.get_column('count').to_numpy()[used])
+        ) * keywords.user_idf[term][used]
+
+        # 활동 시간대: 시간별 대화 수
+        hours = hourly.counts.lazy().group_by(['user_id', 'hour']).agg(
+            pl.col('count').sum()
+        ).join(index, on='user_id').collect()
+        hour = np.zeros((len(users), 24), dtype=np.float32)
+        hour[
+            hours.get_column('row').to_numpy(),
+            hours.get_column('hour').to_numpy(),
+        ] = hours.get_column('count').to_numpy()
+
+        # 활동량: 로그 대화 수를 0~90도 각도로 바꿔 차이가 클수록 멀어지게 함
+        volume = np.log1p(hour.sum(axis=1))
+        angle = volume / max(volume.max(), 1) * np.pi / 2
+        volume = np.stack([np.cos(angle), np.sin(angle)], axis=1)
+
+        self.vectors = np.hstack([
+            np.sqrt(weight) * self.__normalize(block)
+            for weight, block in zip(weights, (content, hour, volume))
+        ]).astype(np.float32)
+
+    @staticmethod
+    def __normalize(matrix: np.ndarray) -> np.ndarray:
+        norm = np.linalg.norm(matrix, axis=1, keepdims=True)
+        return np.divide(
+            matrix, norm, out=np.zeros_like(matrix), where=norm > 0
+        )
+
+    def similar(self, name: str, k: int = 5) -> pl.DataFrame:
+        '''
+        한 유저와 비슷한 유저
+
+        Parameters
+        ----------
+        name: str
+        k: int, default 5
+
+        Returns
+        -------
+        pl.DataFrame
+            유저, 유사도 (대상 유저가 아니면 빈 결과)
+        '''
+        row = self.__rows.get(name)
+        if row is None:
+            index = np.zeros(0, dtype=np.int64)
+            score = np.zeros(0, dtype=np.float32)
+        else:
+            score = self.vectors @ self.vectors[row]
+            score[row] = -np.inf
+            index = self.__top(score[np.newaxis], k)[0]
+            score = score[index]
+        return pl.DataFrame({
+            '유저': self.users.gather(index),
+            '유사도': pl.Series(score.round(3), dtype=pl.Float32),
+        })
+
+    def all_similar(
+            self,
+            k: int = 5,
+            block_size: int = 1024,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        '''
+        모든 유저의 비슷한 유저
+
+        유저 × 유저 유사도 행렬 전체를 만들지 않고 block_size 행씩 곱해
+        메모리를 block_size × 유저 수로 제한합니다.
+
+        Parameters
+        ----------
+        k: int, default 5
+        block_size: int, default 1024
+
+        Returns
+        -------
+        index: np.ndarray
+            (유저 수, k) 비슷한 유저 행 번호
+        score: np.ndarray
+            (유저 수, k) 유사도
+        '''
+        size = len(self.users)
+        k = min(k, size - 1)
+        index = np.zeros((size, max(k, 0)), dtype=np.int64)
+        score = np.zeros((size, max(k, 0)), dtype=np.float32)
+        for start in range(0, size, block_size):
+            end = min(start + block_size, size)
+            block = self.vectors[start:end] @ self.vectors.T
+            block[np.arange(end - start), np.arange(start, end)] = -np.inf
+            index[start:end] = self.__top(block, k)
+            score[start:end] = np.take_along_axis(
+                block, index[start:end], axis=1
+            )
+        return index, score
+
+    @staticmethod
+    def __top(score: np.ndarray, k: int) -> np.ndarray:
+        '''
+        행마다 점수가 높은 k개 열 (내림차순)
+        '''
+        k = min(k, score.shape[1] - 1)
+        if k <= 0:
+            return np.zeros((score.shape[0], 0), dtype=np.int64)
+        top = np.argpartition(-score, k - 1, axis=1)[:, :k]
+        order = np.argsort(
+            -np.take_along_axis(score, top, axis=1), axis=1, kind='stable'
+        )
+        return np.take_along_axis(top, order, axis=1)
@@ -0,0 +1,179 @@
+"""Table-driven classifier for chat and system messages"""
+
+from typing import Tuple, TypeVar
+
+import polars as pl
+
+# 대화 종류 (kind 컬럼)
+EVENT_KINDS = [
+    'chat',     # 이름 : 대화
+    'join',     # 들어왔습니다.
+    'leave',    # 나갔습니다.
+    'kick',     # 내보냈습니다.
+    'hide',     # 채팅방 관리자가 메시지를 가렸습니다.
+    'role',     # 방장/부방장 변경
+    'other',    # 그 밖의 '~님이 ~습니다.'
+    'unknown',  # 구분자도 이벤트 문구도 없는 줄
+]
+EventKind = pl.Enum(EVENT_KINDS)
+
+# 고정 문구로 끝나는 이벤트: 종류, 접미사, event
+SUFFIX_EVENTS = [
+    ('join', '님이 들어왔습니다.', '들어왔습니다.'),
+    ('leave', '님이 나갔습니다.', '나갔습니다.'),
+    ('kick', '님을 내보냈습니다.', '내보냈습니다.'),
+]
+# 문구 전체가 정해진 이벤트: 종류, 문구, name, event
+EXACT_EVENTS = [
+    ('hide', '채팅방 관리자가 메시지를 가렸습니다.', '채팅방 관리자', '메시지를 가렸습니다.'),
+]
+# '방장이 A님에서 B님으로 변경되었습니다.' → B, '방장이 되었습니다.'
+ROLE_PATTERN = r'^(.+?)이 .+?님에서 (.+?)님으로 .'
+OTHER_PATTERN = r'^(.+)님[이을](.+?습니다.)'
+
+# 대화 유형 (type 컬럼, 대화가 아닌 행은 null)
+MESSAGE_TYPES = [
+    'text',
+    'photo',
+    'video',
+    'emoticon',
+    'file',
+    'link',
+    'deleted',
+]
+MessageType = pl.Enum(MESSAGE_TYPES)
+
+# 내용 대신 들어가는 문구: 문구, 유형
+EXACT_TYPES = {
+    '사진': 'photo',
+    '동영상': 'video',
+    '이모티콘': 'emoticon',
+    '파일': 'file',
+    '삭제된 메시지입니다.': 'deleted',
+}
+# 문구 일부로 정하는 유형: 유형, 패턴 (앞쪽 항목 우선)
+PATTERN_TYPES = [
+    ('photo', r'^사진 \d+장$'),
+    ('file', r'^파일: '),
+    ('link', r'https?://'),
+]
+
+Frame = TypeVar('Frame', pl.DataFrame, pl.LazyFrame)
+
+
+def classify_messages(frame: Frame, column: str = 'body') -> Frame:
+    """
+    대화 본문을 name, event, chat, kind로 분류
+
+    대부분인 '이름 : 대화'는 첫 ' : '에서 글자 그대로 잘라 바로 분류하고,
+    구분자가 없는 나머지 행(시스템 메시지)만 따로 떼어 첫 줄에 이벤트 표를
+    차례로 적용한 뒤 행 번호로 병합합니다. polars 정규식은 역추적 없이 입력
+    길이에 선형으로 동작하며, 여러 줄 대화는 정규식에 들어가지 않습니다.
+
+    Parameters
+    ----------
+    frame : pl.DataFrame or pl.LazyFrame
+    column : str, default 'body'
+        대화 본문 컬럼 (결과에서는 빠집니다)
+
+    Return
+    ------
+    pl.DataFrame or pl.LazyFrame
+        name, event, chat, kind (EventKind), type (MessageType)
+    """
+    chat = pl.col('chat')
+    rows = frame.with_row_index('row').with_columns(
+        pl.col(column).str.splitn(' : ', 2).struct.rename_fields(
+            ['head', 'chat']
+        ).alias('split')
+    ).unnest('split')
+
+    chats = rows.filter(chat.is_not_null()).with_columns(
+        pl.col('head').str.strip_chars().alias('name'),
+        pl.lit(None, dtype=pl.Utf8).alias('event'),
+        chat.str.strip_chars(),
+        pl.lit('chat', dtype=EventKind).alias('kind'),
+    ).with_columns(
+        message_type(chat).alias('type')
+    )
+    events = rows.filter(chat.is_null()).with_columns(
+        pl.col('head').str.strip_chars().str.extract(r'^([^\n]*)', 1)
+        .alias('line')
+    ).with_columns(
+        *_event_columns(pl.col('line')),
+        pl.lit(None, dtype=MessageType).alias('type'),
+    ).drop('line')
+    return chats.merge_sorted(events, 'row').drop('row', column, 'head')
+
+
+def message_type(chat: pl.Expr) -> pl.Expr:
+    """
+    대화 내용으로 정하는 유형 (MessageType)
+
+    내용 대신 들어가는 문구와 짧은 패턴을 표 순서대로 확인하며, 어디에도
+    맞지 않으면 text입니다. 문자열 대신 Enum 순서 번호로 합친 뒤 변환합니다.
+
+    Parameters
+    ----------
+    chat : pl.Expr
+        앞뒤 공백을 뗀 대화 내용
+
+    Return
+    ------
+    pl.Expr
+    """
+    def code(key: str) -> pl.Expr:
+        return pl.lit(MESSAGE_TYPES.index(key), dtype=pl.UInt32)
+
+    exact = [
+        pl.when(chat == phrase).then(code(key))
+        for phrase, key in EXACT_TYPES.items()
+    ]
+    patterns = [
+        pl.when(chat.str.contains(pattern)).then(code(key))
+        for key, pattern in PATTERN_TYPES
+    ]
+    return pl.coalesce(*exact, *patterns, code('text')).cast(MessageType)
+
+
+def _event_columns(line: pl.Expr) -> Tuple[pl.Expr, ...]:
+    """
+    시스템 메시지 첫 줄에 이벤트 표를 적용한 name, event, chat, kind
+    """
+    role = line.str.contains(ROLE_PATTERN)
+    other = line.str.contains(OTHER_PATTERN)
+    kind = pl.when(role).then(pl.lit('role')).when(other).then(
+        pl.lit('other')
+    ).otherwise(pl.lit('unknown'))
+    name = pl.when(role).then(
+        line.str.extract(ROLE_PATTERN, 2).str.strip_chars()
+    ).when(other).then(
+        line.str.extract(OTHER_PATTERN, 1).str.strip_chars()
+    ).otherwise(line)
+    event = pl.when(role).then(
+        line.str.extract(ROLE_PATTERN, 1).str.strip_chars() + '이 되었습니다.'
+    ).when(other).then(
+        line.str.extract(OTHER_PATTERN, 2).str.strip_chars()
+    ).otherwise(pl.lit(None, dtype=pl.Utf8))
+    chat = pl.lit(None, dtype=pl.Utf8)
+
+    # 표의 앞쪽 항목이 먼저 적용되도록 뒤에서부터 감쌈
+    for key, phrase, speaker, text in reversed(EXACT_EVENTS):
+        matched = line == phrase
+        kind = pl.when(matched).then(pl.lit(key)).otherwise(kind)
+        name = pl.when(matched).then(pl.lit(speaker)).otherwise(name)
+        event = pl.when(matched).then(pl.lit(text)).otherwise(event)
+        chat = pl.when(matched).then(pl.lit('')).otherwise(chat)
+    for key, suffix, text in reversed(SUFFIX_EVENTS):
+        matched = line.str.ends_with(suffix)
+        kind = pl.when(matched).then(pl.lit(key)).otherwise(kind)
+        name = pl.when(matched).then(
+            line.str.strip_suffix(suffix).str.strip_chars()
+        ).otherwise(name)
+        event = pl.when(matched).then(pl.lit(text)).otherwise(event)
+    return (
+        name.alias('name'),
+        event.alias('event'),
+        chat.alias('chat'),
+        kind.cast(EventKind).alias('kind'),
+    )
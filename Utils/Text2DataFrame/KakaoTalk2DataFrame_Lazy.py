@@ -0,0 +1,102 @@
+"""KakaoTalk txt text convert to DataFrame with a single polars LazyFrame plan"""
+
+import polars as pl
+
+from Utils.Text2DataFrame.EventClassifier import classify_messages
+
+HEADER_PATTERN = (
+    r'^(\d{4}년 \d{1,2}월 \d{1,2}일 오[전후] \d{1,2}:\d{1,2}),?'
+)
+DEFAULT_DATE_FORMAT = '%Y년 %m월 %d일 %p %I:%M'
+
+
+def ko_timestamp(
+        raw: pl.Expr,
+        date_format: str = DEFAULT_DATE_FORMAT,
+) -> pl.Expr:
+    """
+    'YYYY년 M월 D일 오전/오후 H:MM' 문자열을 Datetime으로 변환
+
+    시각은 분 단위이고 대화는 시간순이라 같은 문자열이 연달아 반복됩니다.
+    연속 구간마다 첫 문자열만 변환한 뒤 rle_id로 모든 행에 되돌려 붙입니다.
+    오전/오후는 am/pm으로 바꿔 %p %I로 처리하므로 오전 12시는 0시가 됩니다.
+
+    Parameters
+    ----------
+    raw : pl.Expr
+    date_format : str, default "%Y년 %m월 %d일 %p %I:%M"
+
+    Return
+    ------
+    pl.Expr
+    """
+    head = raw.ne_missing(raw.shift(1))
+    return (
+        raw.filter(head)
+        .str.replace('오전', 'am', literal=True)
+        .str.replace('오후', 'pm', literal=True)
+        .str.replace(',', '', literal=True)
+        .str.to_datetime(format=date_format)
+        .gather(raw.rle_id())
+    )
+
+
+def parse_lazy(
+        text: str,
+        date_format: str = DEFAULT_DATE_FORMAT,
+) -> pl.DataFrame:
+    """
+    대화 본문을 줄 단위 polars 컬럼으로 올려 한 번의 LazyFrame 계획으로 파싱
+
+    시각으로 시작하는 줄을 대화 시작으로 표시하고, 누적합으로 대화 번호를 매긴 뒤
+    이어지는 줄을 group_by로 합칩니다. 줄 중간에 있는 시각은 경계로 보지 않습니다.
+
+    Parameters
+    ----------
+    text : str
+        헤더 두 줄을 제외한 대화 본문
+    date_format : str, default "%Y년 %m월 %d일 %p %I:%M"
+
+    Return
+    ------
+    pl.DataFrame
+        KakaoTalk2DataFrame.data와 같은 스키마
+    """
+    header = pl.col('line').str.extract(HEADER_PATTERN, 1)
+    messages = (
+        pl.LazyFrame({'line': [text]}, schema={'line': pl.Utf8})
+        .select(pl.col('line').str.split('\n'))
+        .explode('line')
+        .with_columns(header.alias('header'))
+        .with_columns(
+            pl.col('header').is_not_null().cum_sum().alias('id')
+        )
+        .filter(pl.col('id') > 0)
+        .with_columns(
+            pl.when(pl.col('header').is_not_null())
+            .then(pl.col('line').str.replace(HEADER_PATTERN, ''))
+            .otherwise(pl.col('line'))
+            .alias('body')
+        )
+        .group_by('id', maintain_order=True)
+        .agg(
+            pl.col('header').first(),
+            pl.col('body').str.concat('\n'),
+        )
+    )
+    messages = classify_messages(
+        messages.with_columns(
+            ko_timestamp(pl.col('header'), date_format).alias('all_date'),
+        ),
+        column='body',
+    )
+    return messages.select(
+        pl.col('all_date'),
+        pl.col('all_date').dt.date().alias('date'),
+        pl.col('all_date').dt.time().alias('time'),
+        pl.col('name'),
+        pl.col('event'),
+        pl.col('chat'),
+        pl.col('kind'),
+        pl.col('type'),
+    ).collect()
@@ -1,13 +1,70 @@
 """KakaoTalk txt File convert to DataFrame"""
 
+import codecs
+import json
+import mmap
+import os
 import polars as pl
 import re
 import datetime
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
 from typing import (
+    Iterable,
+    Iterator,
     List,
+    Optional,
+    TextIO,
     Tuple,
+    Union,
 )
 
+from Utils.Text2DataFrame.EventClassifier import classify_messages
+from Utils.Text2DataFrame.KakaoTalk2DataFrame_Lazy import (
+    ko_timestamp,
+    parse_lazy,
+)
+from Utils.Text2DataFrame.UserIdentity import (
+    resolve_identities,
+    user_id_column,
+)
+
+DATE_PATTERN = re.compile(
+    r'(\d{4}년 \d{1,2}월 \d{1,2}일 오[전후] \d{1,2}:\d{1,2}),?'
+)
+# bytes 패턴에서는 한글 문자 클래스가 바이트 단위로 풀리므로 선택으로 표현
+DATE_PATTERN_BYTES = re.compile(
+    r'\d{4}년 \d{1,2}월 \d{1,2}일 오(?:전|후) \d{1,2}:\d{1,2}'.encode('utf-8')
+)
+LINE_HEADER_BYTES = re.compile(b'\n(' + DATE_PATTERN_BYTES.pattern + b')')
+# 엔진별 조각 경계: regex 엔진은 모든 시각에서, lazy 엔진은 줄 처음의 시각에서만
+# 대화를 나누므로 조각도 같은 위치에서만 잘라야 결과가 같습니다.
+BOUNDARY_PATTERNS = {
+    'regex': DATE_PATTERN,
+    'lazy': re.compile('^' + DATE_PATTERN.pattern, re.MULTILINE),
+}
+BOUNDARY_PATTERNS_BYTES = {
+    'regex': DATE_PATTERN_BYTES,
+    'lazy': re.compile(b'^' + DATE_PATTERN_BYTES.pattern, re.MULTILINE),
+}
+LINE_END = re.compile(rb'\n')
+IO_EVENTS = ['들어왔습니다.', '나갔습니다.', '내보냈습니다.']
+OUT_EVENTS = ['나갔습니다.', '내보냈습니다.']
+
+
+def _limit_threads(threads: int) -> None:
+    """
+    병렬 파싱 프로세스의 polars 스레드 수 제한
+
+    polars 스레드 풀은 처음 쓸 때 만들어지므로 작업 전에 정하면 적용됩니다.
+
+    Parameters
+    ----------
+    threads : int
+    """
+    os.environ['POLARS_MAX_THREADS'] = str(threads)
+
 
 class KakaoTalk2DataFrame:
     """
@@ -15,8 +72,10 @@ class KakaoTalk2DataFrame:
 
         Parameters
         ----------
-        path : str
+        path : str, bytes, memoryview or TextIO
             저장된 데이터의 주소값을 입력합니다.
+            bytes, memoryview를 넣으면 버퍼에서 바로 파싱하며,
+            utf-8 파일 경로는 읽지 않고 mmap으로 엽니다.
 
         not_user : List[str], default None
             분석에서 제외할 유저 이름을 입력합니다.
@@ -29,34 +88,92 @@ class KakaoTalk2DataFrame:
 
         date_format : str, optional, default "%Y년 %m월 %d일 %p %I:%M"
             The strftime to parse time
+
+        chunk_size : int, optional, default None
+            지정하면 파일 전체를 한 번에 읽지 않고 chunk_size 글자씩 읽어
+            대화 시작 시각 경계에서 잘라 배치 단위로 파싱합니다.
+            버퍼 입력은 항상 chunk_size 바이트(기본 4M) 단위로 파싱합니다.
+
+        sink : str, optional, default None
+            chunk_size와 함께 지정하면 배치를 해당 폴더에 Parquet로 바로 기록하고,
+            data는 그 폴더를 읽는 LazyFrame이 됩니다.
+
+        workers : int, optional, default None
+            지정하면 대화 시작 시각 경계로 나눈 배치를 workers개의 프로세스에서
+            병렬로 파싱하고 원래 순서대로 이어 붙입니다.
+
+        engine : str, optional, default 'regex'
+            'regex'는 re.split으로 대화를 나누고, 'lazy'는 줄 단위 polars
+            LazyFrame 계획 하나로 파싱합니다.
+
+        since : datetime, optional, default None
+            지정하면 이 시각 이후(포함)의 대화만 파싱합니다. 버퍼 입력은 이진
+            탐색으로 시작 위치를 찾아 앞부분을 읽지 않습니다.
+
+        aliases : Iterable[Tuple[str, str]], optional, default None
+            같은 사람의 (이전 이름, 이후 이름). 묶인 이름은 같은 user_id를
+            가집니다.
         """
 
     def __init__(
             self,
-            path: str,
+            path: Union[str, bytes, memoryview, TextIO],
             *,
             ispath: bool = True,
             not_user: List[str] = None,
             bot_used: bool = True,
             encoding: str = 'utf-8',
-            date_format: str = '%Y년 %m월 %d일 %p %I:%M'
+            date_format: str = '%Y년 %m월 %d일 %p %I:%M',
+            chunk_size: Optional[int] = None,
+            sink: Optional[str] = None,
+            workers: Optional[int] = None,
+            engine: str = 'regex',
+            since: Optional[datetime.datetime] = None,
+            aliases: Optional[Iterable[Tuple[str, str]]] = None,
     ):
+        if engine not in ('regex', 'lazy'):
+            raise ValueError(f'unknown engine: {engine}')
         self.date_format = date_format
-        if ispath:
-            with open(path, 'r', encoding=encoding) as f:
+        self.engine = engine
+        utf8 = codecs.lookup(encoding).name == 'utf-8'
+        if isinstance(path, (bytes, bytearray, memoryview)):
+            top, save_point = self.__load_buffer(
+                path, encoding, chunk_size, sink, workers, since
+            )
+        elif ispath and utf8:
+            with open(path, 'rb') as f, mmap.mmap(
+                    f.fileno(), 0, access=mmap.ACCESS_READ
+            ) as buffer:
+                top, save_point = self.__load_buffer(
+                    buffer, encoding, chunk_size, sink, workers, since
+                )
+        else:
+            f = open(path, 'r', encoding=encoding) if ispath else path
+            try:
                 top = f.readline().strip()
                 save_point = f.readline().strip()
-                chat_raw = f.read()
-        else:
-            top = path.readline().strip()
-            save_point = path.readline().strip()
-            chat_raw = path.read()
+                if chunk_size is None and workers is None:
+                    self.data = self.parse_text(f.read())
+                else:
+                    self.__load_batches(
+                        self.iter_batches(
+                            f,
+                            chunk_size=chunk_size or 1 << 22,
+                            workers=workers,
+                        ),
+                        sink=sink,
+                    )
+            finally:
+                if ispath:
+                    f.close()
+            if since is not None:
+                self.data = self.data.filter(pl.col('all_date') >= since)
+        self.data = self.encode(self.data)
+        self.identify(aliases)
 
         # 타이틀 및 참여인원 파싱
-        self.title, self.participants_num = top.replace(
-            ' 님과 카카오톡 대화',
-            ''
-        ).rsplit(' ', 1)
+        self.title, self.participants_num = self.__split_top(top)
+        self.bot_used = bot_used
         self.participants_num = int(self.participants_num) - bot_used
 
         # 채팅 저장일 파싱
@@ -64,25 +181,473 @@ class KakaoTalk2DataFrame:
         value = value.replace('오전', 'am').replace('오후', 'pm')
         self.save_point = datetime.datetime.strptime(value, date_format)
 
-        data = self.__text_split(chat_raw)
-        date_ser = pl.Series(data[1::2])
-        date_ser = self.__time_parsing_ko(date_ser)
-        chat_ser = pl.Series(data[2::2])
-        name, event, chat = self.__chat_parsing(chat_ser)
-
-        # 데이터 병합
-        self.data = pl.DataFrame({
-            'all_date': date_ser,
-            'date': date_ser.dt.date(),
-            'time': date_ser.dt.time(),
-            'name': name,
-            'event': event,
-            'chat': chat,
-        }, )
-
         # 활동 유저
         self.get_users(not_user=not_user)
 
+    @staticmethod
+    def encode(
+            data: Union[pl.DataFrame, pl.LazyFrame],
+    ) -> Union[pl.DataFrame, pl.LazyFrame]:
+        """
+        반복되는 name, event 컬럼을 사전 인코딩(Categorical)
+
+        배치마다 인코딩하면 합칠 때 사전을 다시 맞춰야 하므로 전체를 모은 뒤
+        한 번만 적용합니다. 정렬은 문자열 순서를 따릅니다.
+
+        Parameters
+        ----------
+        data : pl.DataFrame or pl.LazyFrame
+
+        Return
+        ------
+        pl.DataFrame or pl.LazyFrame
+        """
+        return data.with_columns(
+            pl.col('name', 'event').cast(pl.Categorical('lexical'))
+        )
+
+    def identify(
+            self,
+            aliases: Optional[Iterable[Tuple[str, str]]] = None,
+    ) -> None:
+        """
+        이름 변경을 union-find로 묶어 data에 user_id 컬럼 추가
+
+        aliases에는 대화에 쓰인 이름별 user_id를, identities에는
+        user_id별 대표 이름(가장 마지막에 쓴 이름)을 둡니다.
+
+        Parameters
+        ----------
+        aliases : Iterable[Tuple[str, str]], optional
+            같은 사람의 (이전 이름, 이후 이름)
+        """
+        self.aliases, self.identities = resolve_identities(self.data, aliases)
+        self.data = self.data.with_columns(user_id_column(self.aliases))
+
+    @staticmethod
+    def __split_top(top: str) -> Tuple[str, str]:
+        """
+        첫 줄에서 타이틀과 참여인원 분리
+
+        Parameters
+        ----------
+        top : str
+
+        Return
+        ------
+        Tuple[str, str]
+        """
+        title, participants_num = top.replace(
+            ' 님과 카카오톡 대화',
+            ''
+        ).rsplit(' ', 1)
+        return title, participants_num
+
+    @classmethod
+    def read_title(
+            cls,
+            buffer: Union[bytes, memoryview],
+            encoding: str = 'utf-8',
+    ) -> str:
+        """
+        본문을 파싱하지 않고 버퍼 첫 줄에서 타이틀만 읽기
+
+        Parameters
+        ----------
+        buffer : bytes, memoryview
+        encoding : str, default 'utf-8'
+
+        Return
+        ------
+        str
+        """
+        with memoryview(buffer) as view:
+            first = LINE_END.search(view).end()
+            top = str(view[:first], encoding).strip()
+        return cls.__split_top(top)[0]
+
+    def save(self, path: str) -> None:
+        """
+        파싱 결과를 폴더에 data.parquet, meta.json으로 저장
+
+        Parameters
+        ----------
+        path : str
+            저장할 폴더
+        """
+        os.makedirs(path, exist_ok=True)
+        # user_id는 불러올 때 aliases로 다시 붙이므로 저장하지 않음
+        data = self.data.select(pl.exclude('user_id'))
+        if isinstance(data, pl.LazyFrame):
+            data.sink_parquet(os.path.join(path, 'data.parquet'))
+        else:
+            data.write_parquet(os.path.join(path, 'data.parquet'))
+        meta = {
+            'title': self.title,
+            'participants': self.participants_num + self.bot_used,
+            'save_point': self.save_point.isoformat(),
+            'date_format': self.date_format,
+            'engine': self.engine,
+        }
+        with open(os.path.join(path, 'meta.json'), 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False)
+
+    @classmethod
+    def load(
+            cls,
+            path: str,
+            *,
+            not_user: List[str] = None,
+            bot_used: bool = True,
+            aliases: Optional[Iterable[Tuple[str, str]]] = None,
+    ) -> 'KakaoTalk2DataFrame':
+        """
+        save로 저장한 폴더에서 파싱 없이 불러오기
+
+        Parameters
+        ----------
+        path : str
+            저장된 폴더
+        not_user : List[str], default None
+        bot_used : bool, default True
+        aliases : Iterable[Tuple[str, str]], optional
+
+        Return
+        ------
+        KakaoTalk2DataFrame
+        """
+        with open(os.path.join(path, 'meta.json'), encoding='utf-8') as f:
+            meta = json.load(f)
+
+        chat = cls.__new__(cls)
+        chat.date_format = meta['date_format']
+        chat.engine = meta['engine']
+        chat.data = cls.encode(
+            pl.read_parquet(os.path.join(path, 'data.parquet'))
+        )
+        chat.identify(aliases)
+        chat.title = meta['title']
+        chat.bot_used = bot_used
+        chat.participants_num = meta['participants'] - bot_used
+        chat.save_point = datetime.datetime.fromisoformat(meta['save_point'])
+        chat.get_users(not_user=not_user)
+        return chat
+
+    def __load_buffer(
+            self,
+            buffer: Union[bytes, bytearray, memoryview, mmap.mmap],
+            encoding: str,
+            chunk_size: Optional[int],
+            sink: Optional[str],
+            workers: Optional[int],
+            since: Optional[datetime.datetime],
+    ) -> Tuple[str, str]:
+        """
+        버퍼에서 헤더 두 줄을 읽고 본문을 배치 단위로 파싱
+
+        Parameters
+        ----------
+        buffer : bytes, bytearray, memoryview or mmap
+        encoding : str
+        chunk_size : int, optional
+        sink : str, optional
+        workers : int, optional
+        since : datetime, optional
+
+        Return
+        ------
+        Tuple[str, str]
+            타이틀 줄, 저장일 줄
+        """
+        with memoryview(buffer) as view:
+            first = LINE_END.search(view).end()
+            second = LINE_END.search(view, first).end()
+            top = str(view[:first], encoding).strip()
+            save_point = str(view[first:second], encoding).strip()
+            start = second
+            if since is not None:
+                start = self.__seek(view, second, since, encoding)
+            texts = self.__iter_buffer_texts(
+                view, start, chunk_size or 1 << 22, encoding
+            )
+            self.__load_batches(
+                self.__parse_texts(texts, workers),
+                sink=sink,
+            )
+        return top, save_point
+
+    def __seek(
+            self,
+            view: memoryview,
+            start: int,
+            since: datetime.datetime,
+            encoding: str,
+    ) -> int:
+        """
+        since 이후 첫 대화가 시작하는 위치를 이진 탐색
+
+        줄 처음에 오는 시각만 대화 경계로 보며, 대화가 시간순이라고 가정합니다.
+
+        Parameters
+        ----------
+        view : memoryview
+        start : int
+            본문 시작 위치
+        since : datetime
+        encoding : str
+
+        Return
+        ------
+        int
+        """
+        def stamp(match: re.Match) -> datetime.datetime:
+            value = str(match.group(1), encoding)
+            value = value.replace('오전', 'am').replace('오후', 'pm')
+            return datetime.datetime.strptime(value, self.date_format)
+
+        low, high = start, len(view)
+        while low < high:
+            mid = (low + high) // 2
+            match = LINE_HEADER_BYTES.search(view, mid)
+            if match is None or stamp(match) >= since:
+                high = mid
+            else:
+                low = match.start(1) + 1
+        match = LINE_HEADER_BYTES.search(view, low)
+        return match.start(1) if match else len(view)
+
+    def __load_batches(
+            self,
+            batches: Iterator[pl.DataFrame],
+            sink: Optional[str],
+    ) -> None:
+        """
+        배치를 이어 붙이거나 sink에 기록하여 data로 지정
+
+        Parameters
+        ----------
+        batches : Iterator[pl.DataFrame]
+        sink : str, optional
+        """
+        if sink is None:
+            batches = list(batches)
+            self.data = pl.concat(batches) if batches else self.parse_text('')
+        else:
+            self.data = self.__sink_parquet(batches, sink=sink)
+
+    def parse_text(
+            self,
+            text: str,
+    ) -> pl.DataFrame:
+        """
+        대화 본문을 DataFrame으로 변환
+
+        Parameters
+        ----------
+        text : str
+
+        Return
+        ------
+        pl.DataFrame
+        """
+        if self.engine == 'lazy':
+            return parse_lazy(text, date_format=self.date_format)
+
+        data = self.__text_split(text)
+        date_ser = pl.Series(data[1::2], dtype=pl.Utf8)
+        date_ser = self.__time_parsing_ko(date_ser)
+        chat_ser = pl.Series(data[2::2], dtype=pl.Utf8)
+
+        # 발화자, 이벤트 분류
+        return classify_messages(
+            pl.LazyFrame({'all_date': date_ser, 'body': chat_ser}),
+            column='body',
+        ).select(
+            pl.col('all_date'),
+            pl.col('all_date').dt.date().alias('date'),
+            pl.col('all_date').dt.time().alias('time'),
+            pl.col('name'),
+            pl.col('event'),
+            pl.col('chat'),
+            pl.col('kind'),
+            pl.col('type'),
+        ).collect()
+
+    def iter_batches(
+            self,
+            f: TextIO,
+            chunk_size: int = 1 << 22,
+            workers: Optional[int] = None,
+    ) -> Iterator[pl.DataFrame]:
+        """
+        대화 본문을 chunk_size 글자씩 읽어 배치 단위 DataFrame으로 반환
+
+        각 배치는 마지막 대화 시작 시각 직전에서 잘리며, 잘린 뒷부분은 다음
+        배치에 이어 붙으므로 결과를 이어 붙이면 한 번에 파싱한 결과와 같습니다.
+
+        Parameters
+        ----------
+        f : TextIO
+            헤더 두 줄을 읽은 뒤의 텍스트 스트림
+        chunk_size : int, default 4M
+        workers : int, optional, default None
+            병렬 파싱에 사용할 프로세스 수
+
+        Return
+        ------
+        Iterator[pl.DataFrame]
+        """
+        return self.__parse_texts(self.__iter_texts(f, chunk_size), workers)
+
+    def __parse_texts(
+            self,
+            texts: Iterator[str],
+            workers: Optional[int],
+    ) -> Iterator[pl.DataFrame]:
+        """
+        본문 조각을 순서대로 파싱
+
+        Parameters
+        ----------
+        texts : Iterator[str]
+        workers : int, optional
+            병렬 파싱에 사용할 프로세스 수
+
+        Return
+        ------
+        Iterator[pl.DataFrame]
+        """
+        if not workers:
+            for text in texts:
+                yield self.parse_text(text)
+            return
+
+        # polars 스레드 풀은 fork 이후 멈출 수 있어 spawn을 사용하고,
+        # 프로세스마다 전체 코어 수만큼 스레드를 만들지 않도록 나눠 줌
+        threads = max((os.cpu_count() or 1) // workers, 1)
+        with ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=get_context('spawn'),
+                initializer=_limit_threads,
+                initargs=(threads,),
+        ) as executor:
+            pending = deque()
+            for text in texts:
+                pending.append(executor.submit(self.parse_text, text))
+                if len(pending) > workers * 2:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+
+    def __iter_texts(
+            self,
+            f: TextIO,
+            chunk_size: int,
+    ) -> Iterator[str]:
+        """
+        대화 시작 시각 경계로 잘린 본문 조각
+
+        Parameters
+        ----------
+        f : TextIO
+        chunk_size : int
+
+        Return
+        ------
+        Iterator[str]
+        """
+        rest = ''
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            rest += chunk
+            cut = self.__last_boundary(rest)
+            if cut:
+                yield rest[:cut]
+                rest = rest[cut:]
+        if rest:
+            yield rest
+
+    def __iter_buffer_texts(
+            self,
+            view: memoryview,
+            start: int,
+            chunk_size: int,
+            encoding: str,
+    ) -> Iterator[str]:
+        """
+        버퍼를 대화 시작 시각 경계에서 잘라 조각별로 디코딩
+
+        Parameters
+        ----------
+        view : memoryview
+        start : int
+            본문 시작 위치
+        chunk_size : int
+            조각의 최소 바이트 수
+        encoding : str
+
+        Return
+        ------
+        Iterator[str]
+        """
+        size = len(view)
+        boundary = BOUNDARY_PATTERNS_BYTES[self.engine]
+        while start < size:
+            match = boundary.search(view, start + chunk_size)
+            end = match.start() if match else size
+            text = str(view[start:end], encoding)
+            # 텍스트 모드로 읽을 때와 같도록 줄바꿈 통일
+            if '\r' in text:
+                text = text.replace('\r\n', '\n').replace('\r', '\n')
+            yield text
+            start = end
+
+    def __last_boundary(self, text: str) -> int:
+        """
+        마지막 대화 시작 시각의 위치 (없으면 0)
+
+        lazy 엔진은 줄 처음의 시각만 경계로 봅니다.
+
+        Parameters
+        ----------
+        text : str
+
+        Return
+        ------
+        int
+        """
+        cut = 0
+        for match in BOUNDARY_PATTERNS[self.engine].finditer(text):
+            cut = match.start()
+        return cut
+
+    @staticmethod
+    def __sink_parquet(
+            batches: Iterator[pl.DataFrame],
+            sink: str,
+    ) -> pl.LazyFrame:
+        """
+        배치를 Parquet 파일로 기록
+
+        Parameters
+        ----------
+        batches : Iterator[pl.DataFrame]
+        sink : str
+            Parquet 파일을 기록할 폴더
+
+        Return
+        ------
+        pl.LazyFrame
+        """
+        os.makedirs(sink, exist_ok=True)
+        if any(name.startswith('part-') for name in os.listdir(sink)):
+            raise FileExistsError(f'{sink} already contains parquet parts')
+        for i, batch in enumerate(batches):
+            batch.write_parquet(os.path.join(sink, f'part-{i:05d}.parquet'))
+        return pl.scan_parquet(os.path.join(sink, 'part-*.parquet'))
+
     def __text_split(
             self,
             text: str = None,
@@ -99,9 +664,7 @@ class KakaoTalk2DataFrame:
         ------
         List[str]
         """
-        date_pattern = r'(\d{4}년 \d{1,2}월 \d{1,2}일 오[전후] \d{1,2}:\d{1,2}),?'
-        date_pattern = re.compile(date_pattern)
-        data = date_pattern.split(text)
+        data = DATE_PATTERN.split(text)
         return data
 
     def __time_parsing_ko(
@@ -111,6 +674,8 @@ class KakaoTalk2DataFrame:
         """
         str to Date
 
+        연달아 반복되는 시각 문자열은 한 번만 변환합니다.
+
         Parameters
         ----------
         date_ser : pl.Series
@@ -122,86 +687,73 @@ class KakaoTalk2DataFrame:
         If parsing succeeded.
 
         """
-        date_ser = date_ser.str.replace('오전', 'am')
-        date_ser = date_ser.str.replace('오후', 'pm')
-        date_ser = date_ser.str.replace(',', '')
-        date_ser = date_ser.str.to_datetime(format=self.date_format)
+        date_ser = date_ser.to_frame('raw').select(
+            ko_timestamp(pl.col('raw'), self.date_format)
+        ).to_series()
         return date_ser
 
-    def __chat_parsing(
+    def membership(self) -> pl.DataFrame:
+        """
+        이름별 마지막 입장/퇴장 이벤트
+
+        Return
+        ------
+        pl.DataFrame
+            name, event, at (입장/퇴장 기록이 없으면 null)
+        """
+        is_io = pl.col('event').is_in(IO_EVENTS)
+        return self.data.lazy().group_by('name', maintain_order=True).agg(
+            pl.col('event').filter(is_io).last(),
+            pl.col('all_date').filter(is_io).last().alias('at'),
+        ).collect()
+
+    def current_users(
             self,
-            chat_ser: pl.Series,
-    ) -> Tuple[pl.Series, pl.Series, pl.Series]:
+            not_user: List[str] = None,
+            membership: Optional[pl.DataFrame] = None,
+    ) -> pl.Series:
         """
-        str to Date
+        현재 채팅방에 남아있는 유저의 대표 이름 (user_id 순)
+
+        이름을 바꾼 유저는 모든 이름 중 가장 마지막 입장/퇴장 이벤트로 판단합니다.
 
         Parameters
         ----------
-
+        not_user : List[str], default None
+        membership : pl.DataFrame, optional
+            membership()의 결과. 없으면 data에서 계산합니다.
 
         Return
         ------
-        pl.DataFrame
-        If parsing succeeded.
+        pl.Series
         """
-        chat_ser = chat_ser.str.replace(
-            r'(.+?)이 .+?님에서 (.+?)님으로 (.|\n)+',
-            r'$2님이 $1이 되었습니다.',
-        )
-        chat_ser = chat_ser.str.replace(
-            '(채팅방 관리자)가 (메시지를 가렸습니다.)',
-            r'$1님이 $2 : ',
-        )
-        chat_ser = chat_ser.str.splitn(' : ', 2)
-        chat_df = chat_ser.struct.rename_fields(
-            ['name', 'chat']).struct.unnest()
-
-        # 발화자, 이벤트 파싱
-        name_event = chat_df.select(
-            pl.col('name')
-            .str.extract_groups(r'((.+)님[이을](.+?습니다.)|(.+))')
-        )
-        name1 = name_event.select(
-            pl.col('name')
-            .struct[1].alias('name')
-        )
-        name2 = name_event.select(
-            pl.col('name')
-            .struct[3].alias('name')
-        )
-        name = name1.select(
-            pl.col('name')
-            .fill_null(name2.get_column('name'))
-        )
-        event = name_event.select(
-            pl.col('name')
-            .struct[2].alias('name')
-        )
+        if membership is None:
+            membership = self.membership()
+        return membership.lazy().with_columns(
+            pl.col('name').cast(pl.Utf8)
+        ).join(self.aliases.lazy(), on='name').group_by('user_id').agg(
+            pl.col('event').sort_by('at').drop_nulls().last()
+        ).filter(
+            ~pl.col('event').is_in(OUT_EVENTS).fill_null(False)
+        ).join(self.identities.lazy(), on='user_id').filter(
+            ~pl.col('name').is_in(not_user or [])
+        ).sort('user_id').collect().get_column('name')
+
+    def get_users(
+            self,
+            not_user,
+            membership: Optional[pl.DataFrame] = None,
+    ):
+        """
+        현재 채팅방에 남아있는 유저
 
-        # 최종 반환
-        name = name.get_column('name').str.strip_chars()
-        event = event.get_column('name').str.strip_chars()
-        chat = chat_df.get_column('chat').str.strip_chars()
-        return name, event, chat
-
-    def get_users(self, not_user):
-        df = self.data
-        user_all = df.get_column('name').unique()
-        user_io = df.filter(
-            pl.col('event')
-            .is_in(['들어왔습니다.', '나갔습니다.', '내보냈습니다.'])
-        ).sort(['name', 'date', 'time'])
-        user_io = user_io.unique(
-            subset=['name'],
-            keep='last',
-            maintain_order=True
-        )
-        user_out = user_io.filter(
-            pl.col('event')
-            .is_in(['나갔습니다.', '내보냈습니다.'])
-        ).get_column('name')
-        result = user_all.filter(~user_all.is_in(user_out))
-        self.users = result.filter(~result.is_in(not_user))
+        Parameters
+        ----------
+        not_user : List[str]
+        membership : pl.DataFrame, optional
+            membership()의 결과. 없으면 data에서 계산합니다.
+        """
+        self.users = self.current_users(not_user, membership)
 
 
 if __name__ == '__main__':
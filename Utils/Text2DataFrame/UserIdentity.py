@@ -0,0 +1,148 @@
+"""Nickname aliases to stable user ids"""
+
+from typing import Dict, Hashable, Iterable, Optional, Tuple, Union
+
+import polars as pl
+
+
+class UnionFind:
+    """
+    같은 사람으로 묶인 이름 집합
+
+    경로 압축과 크기 기준 합치기로 find/union이 거의 상수 시간입니다.
+    """
+
+    def __init__(self):
+        self.parent: Dict[Hashable, Hashable] = {}
+        self.size: Dict[Hashable, int] = {}
+
+    def add(self, item: Hashable) -> None:
+        if item not in self.parent:
+            self.parent[item] = item
+            self.size[item] = 1
+
+    def find(self, item: Hashable) -> Hashable:
+        """
+        item이 속한 집합의 대표
+
+        Parameters
+        ----------
+        item : Hashable
+
+        Return
+        ------
+        Hashable
+        """
+        self.add(item)
+        root = item
+        while self.parent[root] != root:
+            root = self.parent[root]
+        while self.parent[item] != root:
+            self.parent[item], item = root, self.parent[item]
+        return root
+
+    def union(self, a: Hashable, b: Hashable) -> Hashable:
+        """
+        a, b가 속한 집합을 합침
+
+        Parameters
+        ----------
+        a : Hashable
+        b : Hashable
+
+        Return
+        ------
+        Hashable
+            합친 집합의 대표
+        """
+        a, b = self.find(a), self.find(b)
+        if a == b:
+            return a
+        if self.size[a] < self.size[b]:
+            a, b = b, a
+        self.parent[b] = a
+        self.size[a] += self.size[b]
+        return a
+
+
+def resolve_identities(
+        data: Union[pl.DataFrame, pl.LazyFrame],
+        aliases: Optional[Iterable[Tuple[str, str]]] = None,
+) -> Tuple[pl.DataFrame, pl.DataFrame]:
+    """
+    이름 변경(이전 이름, 이후 이름)을 묶어 사람마다 정수 user_id 부여
+
+    user_id는 처음 대화에 나타난 순서로 매기므로 같은 대화에 대화가
+    덧붙어도 바뀌지 않으며, 대표 이름은 가장 마지막에 쓴 이름입니다.
+
+    Parameters
+    ----------
+    data : pl.DataFrame or pl.LazyFrame
+        시간순 대화
+    aliases : Iterable[Tuple[str, str]], optional
+        같은 사람의 (이전 이름, 이후 이름)
+
+    Return
+    ------
+    aliases : pl.DataFrame
+        name (대화에 쓰인 이름, Utf8), user_id
+    identities : pl.DataFrame
+        user_id, name (대표 이름)
+    """
+    names = data.lazy().select(
+        pl.col('name').cast(pl.Utf8)
+    ).with_row_index('row').group_by('name').agg(
+        pl.col('row').min().alias('first'),
+        pl.col('row').max().alias('last'),
+    ).sort('first').collect()
+
+    groups = UnionFind()
+    for name in names.get_column('name'):
+        groups.add(name)
+    for before, after in aliases or ():
+        # 대화에 없는 이름은 무시
+        if before in groups.parent and after in groups.parent:
+            groups.union(before, after)
+
+    table = names.with_columns(
+        pl.Series(
+            'root',
+            [groups.find(name) for name in names.get_column('name')],
+            dtype=pl.Utf8,
+        )
+    )
+    roots = table.group_by('root').agg(
+        pl.col('first').min(),
+        pl.col('name').sort_by('last').last(),
+    ).sort('first').with_row_index('user_id').select(
+        pl.col('user_id').cast(pl.UInt32),
+        pl.col('root'),
+        pl.col('name'),
+    )
+    return (
+        table.join(roots.select('root', 'user_id'), on='root').select(
+            'name', 'user_id'
+        ),
+        roots.select('user_id', 'name'),
+    )
+
+
+def user_id_column(aliases: pl.DataFrame) -> pl.Expr:
+    """
+    name 컬럼을 user_id로 바꾸는 식
+
+    Parameters
+    ----------
+    aliases : pl.DataFrame
+        resolve_identities의 name, user_id
+
+    Return
+    ------
+    pl.Expr
+    """
+    return pl.col('name').cast(pl.Utf8).replace(
+        aliases.get_column('name'),
+        aliases.get_column('user_id'),
+        return_dtype=pl.UInt32,
+    ).alias('user_id')
+
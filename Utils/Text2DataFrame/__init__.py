@@ -1,4 +1,5 @@
+from Utils.Text2DataFrame.KakaoTalk2DataFrame_Lazy import parse_lazy
 from Utils.Text2DataFrame.KakaoTalk2DataFrame_Polars import KakaoTalk2DataFrame
 
-__version__ = '0.0.2.dev1'
-__all__ = ['KakaoTalk2DataFrame']
+__version__ = '0.0.5.dev1'
+__all__ = ['KakaoTalk2DataFrame', 'parse_lazy']
@@ -1,4 +1,15 @@
-from Utils.DataControl import DataHandler
+from Utils.ChatCache import ChatCache
+from Utils.HandlerCache import HandlerCache
+from Utils.RoomStore import RoomStore
 
 __version__ = '0.0.6.dev1'
-__all__ = ['DataHandler']
+__all__ = ['ChatCache', 'DataHandler', 'HandlerCache', 'RoomStore']
+
+
+def __getattr__(name: str):
+    # DataHandler는 streamlit/pandas를 불러오므로 처음 쓸 때 불러옴
+    # (병렬 파싱 프로세스는 Utils.Text2DataFrame만 씀)
+    if name == 'DataHandler':
+        from Utils.DataControl import DataHandler
+        return DataHandler
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
@@ -1,6 +1,5 @@
 import streamlit as st
 from io import StringIO
-from Utils import DataHandler
 from StreamlitModules import dod_metric, filter_block
 from StreamlitScripts import (
     tab_home,
@@ -10,19 +9,71 @@ from StreamlitScripts import (
 )
 
 
+TABS = [tab_home, tab_rank, tab_death_note, tab_management]
+
+
+# polars/pandas를 쓰는 분석 모듈(Utils)은 처음 파일을 올릴 때 불러옴
+@st.cache_resource(show_spinner=False)
+def get_stores():
+    from Utils import ChatCache, HandlerCache, RoomStore
+    return ChatCache(), RoomStore(), HandlerCache()
+
+
+def parse_upload(key: str, append: bool, aliases: tuple, data):
+    # 업로드 내용의 해시(key)별로 세션과 재실행에 걸쳐 파싱 결과를 공유
+    from Utils import DataHandler
+    chat_cache, room_store, handlers = get_stores()
+    return handlers.get(
+        (key, append, aliases),
+        lambda: DataHandler(
+            data=data,
+            bot_used=False,
+            cache=chat_cache,
+            store=room_store if append else None,
+            aliases=aliases,
+            key=key,
+        ),
+    )
+
+
+def parse_aliases(text: str) -> tuple:
+    # 한 줄에 '이전 이름 > 이후 이름'
+    pairs = []
+    for line in text.splitlines():
+        if '>' in line:
+            before, after = line.split('>', 1)
+            pairs.append((before.strip(), after.strip()))
+    return tuple(pairs)
+
+
 def load_dataframe():
     with st.spinner():
         if st.session_state['data'] is not None:
-            data = DataHandler(
-                data=st.session_state['data'],
-                bot_used=st.session_state['bot_used']
-            )
-            st.session_state['df'] = data
+            from Utils import ChatCache
+            with st.session_state['data'].getbuffer() as buffer:
+                st.session_state['upload_key'] = ChatCache.key(buffer)
+            apply_settings()
         else:
-            del st.session_state['df']
+            st.session_state.pop('upload_key', None)
+            st.session_state.pop('df', None)
             side_2.error('파일을 넣어주세요.')
 
 
+def apply_settings():
+    # 설정 변경은 캐시된 파싱 결과에 가볍게 적용
+    if st.session_state.get('upload_key') is None:
+        return
+    data = parse_upload(
+        st.session_state['upload_key'],
+        st.session_state['append'],
+        parse_aliases(st.session_state['aliases']),
+        st.session_state['data'],
+    )
+    st.session_state['df'] = data.with_settings(
+        bot_used=st.session_state['bot_used'],
+    )
+
+
 # Side Bar Setting
 side = st.sidebar
 side_1 = side.container()
@@ -44,26 +95,31 @@ side_3.toggle(
     '방장봇 사용',
     value=True,
     key='bot_used',
-    on_change=load_dataframe
+    on_change=apply_settings
+)
+side_3.toggle(
+    '대화방 누적 저장',
+    value=False,
+    key='append',
+    help='같은 채팅방을 다시 내보낸 파일은 새 대화만 파싱하여 이어 붙입니다.',
+    on_change=apply_settings
+)
+side_3.text_area(
+    '닉네임 변경',
+    key='aliases',
+    placeholder='이전 이름 > 이후 이름',
+    help='한 줄에 하나씩 적은 이름들은 같은 유저로 집계합니다.',
+    on_change=apply_settings
 )
 
-# Tab
-tab = st.tabs([
-    tab_home.title,
-    tab_rank.title,
-    tab_death_note.title,
-    tab_management.title,
-])
-with tab[0]:
-    if 'df' in st.session_state:
-        tab_home.main()
-with tab[1]:
-    if 'df' in st.session_state:
-        tab_rank.main()
-with tab[2]:
-    if 'df' in st.session_state:
-        tab_death_note.main()
-
-with tab[-1]:
-    if 'df' in st.session_state:
-        tab_management.main()
+# Tab (선택한 화면만 실행)
+tab = st.radio(
+    'Tab',
+    range(len(TABS)),
+    format_func=lambda i: TABS[i].title,
+    horizontal=True,
+    key='tab',
+    label_visibility='collapsed',
+)
+if 'df' in st.session_state:
+    TABS[tab].main()
@@ -0,0 +1,492 @@
+"""Benchmarks on synthetic KakaoTalk exports
+
+python benchmark.py timestamp [messages]
+python benchmark.py analytics [messages]
+python benchmark.py startup [repeat]
+python benchmark.py similar [users ...]
+python benchmark.py sessions [messages]
+python benchmark.py chunks [messages]
+python benchmark.py parallel [messages]
+"""
+
+import io
+import os
+import random
+import subprocess
+import sys
+import tempfile
+from datetime import timedelta
+from time import time
+from typing import Tuple
+
+import numpy as np
+import pandas as pd
+import polars as pl
+
+from Utils import DataHandler
+from Utils.ConversationSessions import ConversationSessions
+from Utils.HourlyCube import HourlyCube
+from Utils.Keywords import Keywords
+from Utils.SimilarUsers import SimilarUsers
+from Utils.Text2DataFrame import KakaoTalk2DataFrame
+from Utils.Text2DataFrame.KakaoTalk2DataFrame_Lazy import ko_timestamp
+
+
+def make_export(
+        messages: int,
+        users: int = 300,
+        seed: int = 0,
+        per_minute: float = 1.0,
+        vocabulary: int = 0,
+) -> str:
+    '''
+    합성 카카오톡 대화 내보내기 텍스트
+
+    Parameters
+    ----------
+    messages : int
+    users : int, default 300
+    seed : int, default 0
+    per_minute : float, default 1.0
+        분당 평균 대화 수
+    vocabulary : int, default 0
+        0보다 크면 일반 대화를 이 개수의 한글 단어에서 Zipf 분포로 뽑은
+        3~10 단어로 만듦 (0이면 고정 문구)
+
+    Returns
+    -------
+    str
+    '''
+    rng = random.Random(seed)
+    names = [f'유저{i}' for i in range(users)]
+    if vocabulary:
+        # 대화 순서와 무관하도록 단어는 따로 뽑음 (나머지 대화는 그대로)
+        word_rng = random.Random(seed + 1)
+        words = [
+            ''.join(
+                chr(0xAC00 + word_rng.randrange(11172))
+                for _ in range(word_rng.randint(2, 3))
+            )
+            for _ in range(vocabulary)
+        ]
+        weights = np.cumsum(1 / np.arange(1, vocabulary + 1)).tolist()
+    lines = [
+        f'벤치마크 님과 카카오톡 대화 {users}',
+        '저장한 날짜 : 2024년 3월 30일 오후 3:21',
+        '',
+    ]
+    minute = 0
+    day = 0
+    for i in range(messages):
+        if per_minute < 1:
+            # 분당 1개 미만이면 대화 사이에 여러 분의 공백
+            minute += round(rng.expovariate(per_minute))
+        else:
+            minute += rng.random() < 1 / per_minute
+        day, minute = day + minute // 1440, minute % 1440
+        year, rest = divmod(day, 336)
+        month, date = divmod(rest, 28)
+        hour, mm = divmod(minute, 60)
+        stamp = (
+            f'{2020 + year}년 {month + 1}월 {date + 1}일 '
+            f'{"오전" if hour < 12 else "오후"} {hour % 12 or 12}:{mm:02d}'
+        )
+        name = rng.choice(names)
+        kind = rng.random()
+        if kind < 0.02:
+            lines.append(f'{stamp}, {name}님이 들어왔습니다.')
+        elif kind < 0.03:
+            lines.append(f'{stamp}, {name}님이 나갔습니다.')
+        elif kind < 0.1:
+            lines.append(f'{stamp}, {name} : 사진')
+        elif kind < 0.2:
+            lines.append(f'{stamp}, {name} : 여러 줄 메시지 {i}\n다음 줄')
+        elif vocabulary:
+            sentence = ' '.join(word_rng.choices(
+                words, cum_weights=weights, k=word_rng.randint(3, 10)
+            ))
+            lines.append(f'{stamp}, {name} : {sentence}')
+        else:
+            lines.append(f'{stamp}, {name} : 안녕하세요 메시지 {i}')
+    return '\n'.join(lines) + '\n'
+
+
+def bench_timestamp(messages: int = 1_000_000) -> None:
+    '''
+    행마다 strptime 하던 시각 변환과 연속 구간별 1회 변환 비교
+    '''
+    for per_minute in (1, 5, 20):
+        text = make_export(messages, per_minute=per_minute)
+        stamps = pl.Series(
+            'raw',
+            [line.split(',', 1)[0] for line in text.split('\n')[3:]
+             if line[:1] == '2'],
+        )
+
+        start = time()
+        old = (
+            stamps.str.replace('오전', 'am')
+            .str.replace('오후', 'pm')
+            .str.replace(',', '')
+            .str.to_datetime(format='%Y년 %m월 %d일 %p %I:%M')
+        )
+        old_time = time() - start
+
+        start = time()
+        new = stamps.to_frame().select(ko_timestamp(pl.col('raw'))).to_series()
+        new_time = time() - start
+
+        assert old.equals(new)
+        print(f'rows: {len(stamps)}, unique: {stamps.n_unique()}')
+        print(f'  strptime per row : {old_time : .4f}')
+        print(f'  memoized         : {new_time : .4f}')
+        print(f'  speed-up         : {old_time / new_time : .2f}x')
+
+
+def bench_chunks(messages: int = 20_000) -> None:
+    '''
+    조각 크기, 입력 형태, 병렬 여부와 관계없이 같은 결과인지 확인
+
+    대화 중간에 시각을 인용한 메시지를 섞어, 조각 경계가 엔진의 대화 경계와
+    다르면 결과가 달라지도록 합니다.
+    '''
+    text = make_export(messages).replace(
+        ' : 안녕하세요', ' : 2020년 1월 1일 오후 1:00 안녕하세요'
+    )
+    raw = text.encode('utf-8')
+
+    def parse(engine, **kwargs):
+        if kwargs.pop('textio', False):
+            source = io.StringIO(text)
+            kwargs['ispath'] = False
+        else:
+            source = raw
+        start = time()
+        data = KakaoTalk2DataFrame(
+            source, bot_used=False, engine=engine, **kwargs
+        ).data
+        elapsed = time() - start
+        return data.with_columns(pl.col('name', 'event').cast(pl.Utf8)), elapsed
+
+    cases = {
+        'text 4M': {'textio': True, 'chunk_size': 1 << 22},
+        'text 7777': {'textio': True, 'chunk_size': 7777},
+        'text 1000': {'textio': True, 'chunk_size': 1000},
+        'bytes 4M': {},
+        'bytes 7777': {'chunk_size': 7777},
+        'bytes 1000': {'chunk_size': 1000},
+        'bytes 64k x2': {'chunk_size': 1 << 16, 'workers': 2},
+    }
+    # 인용한 시각이 없으면 두 엔진의 결과가 같음
+    plain = make_export(messages).encode('utf-8')
+    regex, lazy = (
+        KakaoTalk2DataFrame(plain, bot_used=False, engine=engine).data
+        .with_columns(pl.col('name', 'event').cast(pl.Utf8))
+        for engine in ('regex', 'lazy')
+    )
+    assert regex.equals(lazy)
+
+    for engine in ('regex', 'lazy'):
+        # 조각으로 나누지 않은 TextIO 파싱이 기준
+        expected, base_time = parse(engine, textio=True, chunk_size=None)
+        print(f'{engine}: rows {len(expected)}')
+        print(f'  {"text whole":<14}: {base_time : .4f}')
+        for label, kwargs in cases.items():
+            data, elapsed = parse(engine, **kwargs)
+            assert data.equals(expected), (engine, label)
+            print(f'  {label:<14}: {elapsed : .4f}')
+
+
+PARALLEL_SCRIPT = """
+import sys
+from time import time
+
+from Utils.Text2DataFrame import KakaoTalk2DataFrame
+
+with open(sys.argv[1], 'rb') as f:
+    raw = f.read()
+start = time()
+data = KakaoTalk2DataFrame(raw, bot_used=False, workers=int(sys.argv[2]) or None)
+print(time() - start)
+data.data.write_parquet(sys.argv[3])
+"""
+
+
+def bench_parallel(messages: int = 1_000_000) -> None:
+    '''
+    한 프로세스 파싱과 프로세스 풀 병렬 파싱 비교 (4MB 조각)
+
+    spawn 작업자는 __main__ 모듈을 다시 불러오므로, 이 파일(DataHandler 포함)이
+    아닌 파서만 불러오는 새 프로세스에서 실제 앱과 같은 조건으로 잽니다.
+    '''
+    cores = os.cpu_count() or 1
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, 'export.txt')
+        with open(path, 'wb') as f:
+            f.write(make_export(messages).encode('utf-8'))
+
+        def run(workers: int) -> Tuple[float, pl.DataFrame]:
+            output = os.path.join(folder, f'{workers}.parquet')
+            elapsed = subprocess.run(
+                [sys.executable, '-c', PARALLEL_SCRIPT, path, str(workers),
+                 output],
+                cwd=os.path.dirname(os.path.abspath(__file__)),
+                capture_output=True,
+                text=True,
+                check=True,
+            ).stdout.split()[0]
+            return float(elapsed), pl.read_parquet(output).with_columns(
+                pl.col('name', 'event').cast(pl.Utf8)
+            )
+
+        serial_time, expected = run(0)
+        print(f'size: {os.path.getsize(path) / 2 ** 20 : .1f} MiB, '
+              f'rows: {len(expected)}, cores: {cores}')
+        print(f'  serial     : {serial_time : .4f}')
+        for workers in sorted({1, 2, 4, cores}):
+            elapsed, data = run(workers)
+            assert data.equals(expected)
+            print(f'  workers {workers:<3}: {elapsed : .4f} '
+                  f'({serial_time / elapsed : .2f}x)')
+
+
+def legacy_chat_count(df, users, min_date, max_date):
+    '''
+    pandas로 변환한 전체 대화에서 유저별 대화 수를 세던 이전 방식
+    '''
+    date_range = pd.date_range(start=min_date, end=max_date)
+    result_df = df[
+        df['name'].isin(users)
+        & df['event'].isna()
+        & df['date'].isin(date_range)
+    ]
+    chat_zero_users = users[~np.isin(users, result_df['name'].unique())]
+    chat_zero_users = df[
+        df['name'].isin(chat_zero_users)
+    ].groupby('name')[['date']].max().reset_index()
+    chat_zero_users['count'] = 0
+    chat_zero_users = chat_zero_users.rename(
+        columns={'name': '유저', 'count': '대화 빈도', 'date': '마지막 대화'}
+    )
+    result_df = result_df.groupby(['name'])[['date']].agg(
+        ['count', 'max']
+    ).date.reset_index()
+    result_df = result_df.rename(
+        columns={'name': '유저', 'count': '대화 빈도', 'max': '마지막 대화'}
+    )
+    return pd.concat([result_df, chat_zero_users])
+
+
+def legacy_rank(df, users, min_date, max_date):
+    result_df = legacy_chat_count(df, users, min_date, max_date)
+    result_df = result_df.sort_values(
+        ['대화 빈도', '유저'], ascending=[False, True], ignore_index=True
+    )
+    result_df['마지막 대화'] = (
+        pd.Timestamp(max_date) - result_df['마지막 대화']
+    ).dt.days.apply(lambda x: f'{x:2}일 전' if x else '오늘')
+    result_df = result_df.head(20)
+    result_df.index += 1
+    return result_df
+
+
+def legacy_death_note(df, users, save_point, min_date, max_date, num):
+    result_df = legacy_chat_count(df, users, min_date, max_date)
+    result_df = result_df[result_df['대화 빈도'] <= num]
+    death_user_in = df[
+        df['name'].isin(result_df['유저'])
+        & df['event'].isin(['들어왔습니다.'])
+    ].drop_duplicates(subset='name', keep='last')[['name', 'date']]
+    result_df = result_df.merge(
+        death_user_in.rename(columns={'name': '유저', 'date': '입장'})
+    )[['유저', '대화 빈도', '마지막 대화']]
+    result_df = result_df.sort_values(
+        ['대화 빈도', '유저'], ascending=[True, True], ignore_index=True
+    )
+    result_df['마지막 대화'] = (
+        save_point - result_df['마지막 대화']
+    ).dt.days.apply(lambda x: f'{x:2}일 전' if x else '오늘')
+    return result_df
+
+
+def bench_analytics(messages: int = 1_000_000) -> None:
+    '''
+    pandas 복사본 기반 rank/death_note와 polars 기반 비교
+    '''
+    upload = io.BytesIO(make_export(messages, per_minute=5).encode('utf-8'))
+    data = DataHandler(upload, bot_used=False)
+    max_date = data.end_point
+    min_date = max_date - timedelta(days=30)
+
+    start = time()
+    df = data.df.with_columns(
+        pl.col('name', 'event').cast(pl.Utf8)
+    ).to_pandas()
+    users = data.users.cast(pl.Utf8).to_numpy()
+    convert_time = time() - start
+    pandas_size = df.memory_usage(deep=True).sum()
+    polars_size = data.df.estimated_size()
+
+    start = time()
+    old_rank = legacy_rank(df, users, min_date, max_date)
+    old_death = legacy_death_note(
+        df, users, data.save_point, min_date, max_date, 100
+    )
+    old_time = time() - start
+
+    start = time()
+    new_rank = data.rank(min_date, max_date, 'YYYY-MM-DD', '📑 전체')
+    new_death = data.death_note(
+        min_date, max_date, 100, 'YYYY-MM-DD', '대화 빈도', True
+    )
+    new_time = time() - start
+
+    for old, new in ((old_rank, new_rank), (old_death, new_death)):
+        assert old['유저'].tolist() == new['유저'].tolist()
+        assert old['대화 빈도'].tolist() == new['대화 빈도'].tolist()
+        assert old['마지막 대화'].tolist() == new['마지막 대화'].tolist()
+
+    print(f'rows: {len(data.df)}')
+    print(f'memory  pandas copy : {pandas_size / 2 ** 20 : .1f} MiB (+ polars)')
+    print(f'memory  polars only : {polars_size / 2 ** 20 : .1f} MiB')
+    print(f'to_pandas           : {convert_time : .4f}')
+    print(f'rank + death_note   pandas : {old_time : .4f}')
+    print(f'rank + death_note   polars : {new_time : .4f}')
+
+
+STARTUP_SCRIPT = """
+import sys
+from time import time
+
+start = time()
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file('app.py', default_timeout=60)
+at.run()
+heavy = [m for m in ('pandas', 'numpy', 'polars', 'pyarrow') if m in sys.modules]
+print(time() - start, ','.join(heavy))
+"""
+
+
+def bench_startup(repeat: int = 5) -> None:
+    '''
+    새 프로세스에서 app.py를 처음 실행하는 시간과 불러온 무거운 모듈
+    '''
+    times = []
+    for _ in range(repeat):
+        output = subprocess.run(
+            [sys.executable, '-c', STARTUP_SCRIPT],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.split()
+        times.append(float(output[0]))
+    heavy = output[1] if len(output) > 1 else '-'
+    print(f'runs              : {repeat}')
+    print(f'cold start min    : {min(times) : .4f}')
+    print(f'cold start median : {sorted(times)[repeat // 2] : .4f}')
+    print(f'heavy modules     : {heavy}')
+
+
+def peak_rss() -> int:
+    '''
+    프로세스 최대 메모리 사용량 (bytes)
+    '''
+    import resource
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS는 bytes, Linux는 KiB
+    return usage if sys.platform == 'darwin' else usage * 1024
+
+
+def bench_similar(*sizes: int) -> None:
+    '''
+    유저 수를 늘려 가며 비슷한 유저 추천 (유저당 50개 대화, 2만 단어)
+    '''
+    for users in sizes or (100, 1000, 5000):
+        text = make_export(
+            users * 50, users=users, per_minute=20, vocabulary=20_000
+        )
+        data = DataHandler(io.BytesIO(text.encode('utf-8')), bot_used=False)
+
+        start = time()
+        keywords = Keywords(data.df)
+        engine = SimilarUsers(
+            HourlyCube(data.df), keywords, data.cube.users
+        )
+        build_time = time() - start
+
+        name = data.users[0]
+        start = time()
+        engine.similar(name, k=5)
+        query_time = time() - start
+
+        start = time()
+        index, score = engine.all_similar(k=5)
+        all_time = time() - start
+
+        if len(data.users) <= 1000:
+            # 블록 곱 결과가 전체 행렬 곱과 같은지 확인
+            full = engine.vectors @ engine.vectors.T
+            np.fill_diagonal(full, -np.inf)
+            expected = -np.sort(-full, axis=1)[:, :5]
+            assert np.allclose(score, expected, atol=1e-5)
+
+        vectors = engine.vectors
+        print(f'users: {len(data.users)}, '
+              f'words: {len(keywords.vocabulary)}, '
+              f'vectors: {vectors.shape}')
+        print(f'  vectors memory   : {vectors.nbytes / 2 ** 20 : .1f} MiB')
+        print(f'  keywords memory  : '
+              f'{keywords.counts.estimated_size() / 2 ** 20 : .1f} MiB')
+        print(f'  peak RSS         : {peak_rss() / 2 ** 20 : .1f} MiB')
+        print(f'  build            : {build_time : .4f}')
+        print(f'  one user top-5   : {query_time : .4f}')
+        print(f'  all users top-5  : {all_time : .4f}')
+
+
+def bench_sessions(messages: int = 1_000_000) -> None:
+    '''
+    대화 세션 나누기와 기간별 유저 세션/응답 시간 조회
+    '''
+    # 평균 10분 간격이라 30분 공백으로 세션이 자주 나뉨
+    upload = io.BytesIO(
+        make_export(messages, per_minute=0.1).encode('utf-8')
+    )
+    data = DataHandler(upload, bot_used=False)
+    max_date = data.end_point
+    min_date = max_date - timedelta(days=30)
+
+    start = time()
+    sessions = ConversationSessions(data.df)
+    build_time = time() - start
+
+    start = time()
+    sessions.users(min_date, max_date)
+    sessions.summary(min_date, max_date)
+    window_time = time() - start
+
+    start = time()
+    sessions.users()
+    all_time = time() - start
+
+    print(f'rows: {len(data.df)}, sessions: {len(sessions.sessions)}')
+    print(f'  build            : {build_time : .4f}')
+    print(f'  30 days          : {window_time : .4f}')
+    print(f'  all days         : {all_time : .4f}')
+
+
+BENCHMARKS = {
+    'timestamp': bench_timestamp,
+    'analytics': bench_analytics,
+    'startup': bench_startup,
+    'similar': bench_similar,
+    'sessions': bench_sessions,
+    'chunks': bench_chunks,
+    'parallel': bench_parallel,
+}
+
+
+if __name__ == '__main__':
+    name = sys.argv[1] if len(sys.argv) > 1 else 'timestamp'
+    args = [int(arg) for arg in sys.argv[2:]]
+    BENCHMARKS[name](*args)